@@ -1,6 +1,6 @@
 from flask import (
     Flask, render_template, request, redirect, url_for,
-    flash, Response, jsonify, abort
+    flash, Response, jsonify, abort, send_file
 )
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import (
@@ -8,18 +8,34 @@ from flask_login import (
     current_user, UserMixin
 )
 from flask_bcrypt import Bcrypt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from xhtml2pdf import pisa
 import csv
 from io import BytesIO, StringIO
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
 import os
-from datetime import datetime
+import random
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from urllib.parse import urlparse
 from requests.utils import requote_uri
 from itsdangerous import URLSafeTimedSerializer
+from scrapers.urls import canonical_url
+from scrapers.registry import (
+    scrape, submit_scrape, platform_for, stats as scraper_stats, ScrapeResult, BACKEND as SCRAPER_BACKEND
+)
+from scrapers import breaker, conditional
+from scrapers.session import get_session
+from utils.imgcache import ImageCache
+from utils.thumbnails import snap_width, pick_format, make_thumbnail
+from utils.notifier import Mailer
+from utils.scrapecache import ScrapeCache
 import google.generativeai as genai
 
 # =====================================================================
@@ -29,17 +45,56 @@ app = Flask(__name__, template_folder="templates", static_folder="static")
 app.secret_key = os.environ.get("SECRET_KEY", "supersecretkey")
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "instance", "users.db")
+DB_PATH = os.environ.get("DB_PATH", os.path.join(BASE_DIR, "instance", "users.db"))
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("DATABASE_URL", f"sqlite:///{DB_PATH}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# The web workers, checker.py and scheduler.py all share one SQLite file.
+# WAL lets readers run while a writer commits, and busy_timeout makes a
+# second writer wait for the lock instead of failing with "database is
+# locked". synchronous=NORMAL is still crash-safe in WAL mode (a power cut
+# can only lose the last commits).
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 15000))
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_BYTES = int(os.environ.get("SQLITE_MMAP_BYTES", 256 * 1024 * 1024))
+SQLITE_CACHE_KB = int(os.environ.get("SQLITE_CACHE_KB", 64 * 1024))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+
+_db_uri = app.config['SQLALCHEMY_DATABASE_URI']
+_engine_options = {}
+if _db_uri.startswith("sqlite"):
+    _engine_options['connect_args'] = {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False}
+if _db_uri not in ("sqlite://", "sqlite:///:memory:"):  # in-memory databases use a single static connection
+    _engine_options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_pre_ping=True)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options
+
+
+@event.listens_for(Engine, "connect")
+def _sqlite_pragmas(dbapi_conn, _record):
+    if not isinstance(dbapi_conn, sqlite3.Connection):
+        return
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_BYTES}")
+    cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")  # negative = KiB rather than pages
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+
 db = SQLAlchemy(app)
 bcrypt = Bcrypt(app)
 
 # Gmail SMTP Configuration
 GMAIL_USER = os.environ.get("GMAIL_USER")
 GMAIL_PASS = os.environ.get("GMAIL_PASS")
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
+SMTP_SECURITY = os.environ.get("SMTP_SECURITY", "starttls")  # starttls | ssl | none (local test servers)
+SMTP_MAX_PER_SESSION = int(os.environ.get("SMTP_MAX_PER_SESSION", 100))
 
 # Token serializer for password reset
 serializer = URLSafeTimedSerializer(app.secret_key)
@@ -58,6 +113,9 @@ login_manager.init_app(app)
 # Placeholder Image
 PLACEHOLDER_IMG = "https://via.placeholder.com/240x240?text=No+Image"
 
+# Products per dashboard page
+DASHBOARD_PAGE_SIZE = int(os.environ.get("DASHBOARD_PAGE_SIZE", 24))
+
 # =====================================================================
 # Database Models
 # =====================================================================
@@ -78,8 +136,78 @@ class Product(db.Model):
     target_price = db.Column(db.Float)
     image_url = db.Column(db.String(600))
     platform = db.Column(db.String(50))
+    listing_id = db.Column(db.Integer, db.ForeignKey('listing.id'), index=True)
+    rating = db.Column(db.Float)
+    rating_count = db.Column(db.Integer)
+    status = db.Column(db.String(20), default='ready', server_default='ready')  # pending | ready | failed
     last_checked = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_alert_price = db.Column(db.Float)  # NULL = armed, see alert_due()
+    last_alert_at = db.Column(db.DateTime)
+    # the unique constraint also serves per-user lookups; the second index pages the dashboard
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'url', name='uq_product_user_url'),
+        db.Index('ix_product_user_created', 'user_id', 'created_at'),
+    )
+
+
+class Listing(db.Model):
+    """A canonical product page, shared by every user's Product that tracks it"""
+    id = db.Column(db.Integer, primary_key=True)
+    canonical_url = db.Column(db.String(300), unique=True, nullable=False)
+    platform = db.Column(db.String(50))
+    title = db.Column(db.String(200))
+    current_price = db.Column(db.Float)
+    image_url = db.Column(db.String(600))
+    rating = db.Column(db.Float)
+    rating_count = db.Column(db.Integer)
+    last_checked = db.Column(db.DateTime)
+    # validators from the last successful scrape, sent back as a conditional request
+    etag = db.Column(db.String(200))
+    last_modified = db.Column(db.String(64))
+    content_hash = db.Column(db.String(40))
+    # adaptive refresh scheduling (see plan_next_check)
+    next_check_at = db.Column(db.DateTime, index=True)
+    fail_count = db.Column(db.Integer, default=0, server_default='0')
+    stable_checks = db.Column(db.Integer, default=0, server_default='0')
+    volatility = db.Column(db.Float, default=0.0, server_default='0')
+    last_viewed_at = db.Column(db.DateTime)
+    products = db.relationship('Product', backref='listing', lazy=True)
+
+    def apply(self, info, price, fingerprint=True):
+        """Copy a scrape onto the listing; fingerprint=False for unconditional scrapes, which record no validators"""
+        moved = price != self.current_price
+        self.current_price = price
+        self.last_checked = datetime.utcnow()
+        if info.title:
+            self.title = info.title[:200]
+        if info.image:
+            self.image_url = info.image
+        if info.rating is not None:
+            self.rating = info.rating
+        if info.rating_count is not None:
+            self.rating_count = info.rating_count
+        if fingerprint:
+            fp = conditional.known(self.canonical_url)
+            self.etag, self.last_modified, self.content_hash = fp.etag, fp.last_modified, fp.digest
+        elif moved:  # the stored validators describe a page with another price
+            self.etag = self.last_modified = self.content_hash = None
+
+
+class PriceHistory(db.Model):
+    """One observed price per row; rolled-up rows also carry the bucket's min/max"""
+    __tablename__ = 'price_history'
+    __table_args__ = (db.Index('ix_price_history_product_ts', 'product_id', 'ts'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    ts = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    price = db.Column(db.Float)  # last price in the bucket for rolled-up rows
+    price_min = db.Column(db.Float)
+    price_max = db.Column(db.Float)
+    rating = db.Column(db.Float)
+    rating_count = db.Column(db.Integer)
+    resolution = db.Column(db.String(8), nullable=False, default='raw', server_default='raw')  # raw | hour | day
 
 
 # =====================================================================
@@ -106,6 +234,9 @@ ALLOWED_IMG_SUFFIXES = (
     "meesho.com",
     "flixcart.com",
     "myntassets.com",
+    "croma.com",
+    "ajio.com",
+    "nykaa.com",
 )
 
 
@@ -119,6 +250,12 @@ def _referer_for_host(host: str) -> str:
         return "https://www.flipkart.com/"
     if "myntassets.com" in host or "myntra.com" in host:
         return "https://www.myntra.com/"
+    if "croma.com" in host:
+        return "https://www.croma.com/"
+    if "ajio.com" in host:
+        return "https://www.ajio.com/"
+    if "nykaa.com" in host:
+        return "https://www.nykaa.com/"
     return ""
 
 
@@ -135,6 +272,141 @@ IMG_HEADERS = {
     "Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
 }
 
+# Proxied images are cached on disk (shared by all workers) and revalidated
+# upstream with ETag / Last-Modified once older than IMG_CACHE_TTL seconds.
+img_cache = ImageCache(
+    root=os.environ.get("IMG_CACHE_DIR", os.path.join(BASE_DIR, "instance", "img_cache")),
+    max_bytes=int(os.environ.get("IMG_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+    ttl=int(os.environ.get("IMG_CACHE_TTL", 86400)),
+)
+# Upstream bodies are streamed through in chunks and never buffered whole
+IMG_MAX_BYTES = int(os.environ.get("IMG_MAX_BYTES", 8 * 1024 * 1024))
+IMG_CHUNK_SIZE = 64 * 1024
+
+
+def _send_cached_img(entry):
+    """Serve a cached image; send_file answers If-None-Match / If-Modified-Since with 304"""
+    return send_file(
+        entry.path,
+        mimetype=entry.content_type,
+        etag=entry.digest,
+        last_modified=entry.meta.get("fetched_at"),
+        max_age=86400,
+        conditional=True,
+    )
+
+
+def _fetch_upstream_img(src, host, cached):
+    """Conditional GET for src.
+
+    Returns the 200 image response to read, or None when `cached` should be
+    served instead (revalidated by a 304, or stale because upstream failed).
+    Aborts with 502 when there is nothing to serve.
+    """
+    headers = IMG_HEADERS.copy()
+    ref = _referer_for_host(host)
+    if ref:
+        headers["Referer"] = ref
+    if cached:
+        if cached.meta.get("etag"):
+            headers["If-None-Match"] = cached.meta["etag"]
+        if cached.meta.get("last_modified"):
+            headers["If-Modified-Since"] = cached.meta["last_modified"]
+
+    try:
+        r = get_session(src).get(src, timeout=10, headers=headers, stream=True)
+    except requests.RequestException:
+        if cached:  # upstream down: a stale image beats a broken one
+            return None
+        abort(502)
+
+    if r.status_code == 304 and cached:
+        r.close()
+        img_cache.revalidated(cached)
+        return None
+
+    ctype = r.headers.get("Content-Type", "")
+    if r.status_code != 200 or not ctype.startswith("image/"):
+        r.close()
+        if cached:
+            return None
+        abort(502)
+
+    declared = r.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > IMG_MAX_BYTES:
+        r.close()
+        abort(502, "image too large")
+    return r
+
+
+def _stream_img(src, r):
+    """Relay an upstream image to the client chunk by chunk, teeing it into the cache"""
+    ctype = r.headers.get("Content-Type", "")
+    declared = r.headers.get("Content-Length")
+    state = {"writer": None, "done": False}
+
+    def stream():
+        writer = state["writer"] = img_cache.writer(src, ctype, etag=r.headers.get("ETag"),
+                                                    last_modified=r.headers.get("Last-Modified"))
+        for chunk in r.iter_content(IMG_CHUNK_SIZE):
+            if writer.size + len(chunk) > IMG_MAX_BYTES:
+                app.logger.warning(f"Image over IMG_MAX_BYTES, truncated: {src}")
+                return  # only without a usable Content-Length; kept out of the cache
+            writer.write(chunk)
+            yield chunk
+        writer.commit()
+        state["done"] = True
+
+    def cleanup():
+        # runs even if the body was never iterated (HEAD, dropped response) or the client left mid-body
+        r.close()
+        if state["writer"] is not None and not state["done"]:
+            state["writer"].abort()
+
+    out_headers = {"Content-Type": ctype, "Cache-Control": "public, max-age=86400"}
+    # oversized declared lengths were rejected with a 502 in _fetch_upstream_img, so an unencoded
+    # body with a Content-Length is never truncated; anything else goes out without one, so a
+    # body cut at IMG_MAX_BYTES never contradicts its headers
+    if declared and declared.isdigit() and int(declared) <= IMG_MAX_BYTES and not r.headers.get("Content-Encoding"):
+        out_headers["Content-Length"] = declared
+    resp = Response(stream(), headers=out_headers)
+    resp.call_on_close(cleanup)
+    return resp
+
+
+def _download_img(src, r):
+    """Read an upstream image fully into the cache (needed before resizing)"""
+    writer = img_cache.writer(src, r.headers.get("Content-Type", ""), etag=r.headers.get("ETag"),
+                              last_modified=r.headers.get("Last-Modified"))
+    try:
+        for chunk in r.iter_content(IMG_CHUNK_SIZE):
+            if writer.size + len(chunk) > IMG_MAX_BYTES:
+                writer.abort()
+                abort(502, "image too large")
+            writer.write(chunk)
+        return writer.commit()
+    except requests.RequestException:
+        writer.abort()
+        abort(502)
+    finally:
+        r.close()
+
+
+def _send_thumbnail(src, original, width):
+    """Serve a resized derivative of a cached original, generating it once"""
+    fmt = pick_format(request.headers.get("Accept", ""))
+    # keyed on the original's digest, so a changed upstream image gets new derivatives
+    key = f"{src}#w={width}&fmt={fmt}&src={original.digest}"
+    entry = img_cache.get(key)
+    if entry is None:
+        data = make_thumbnail(original.path, width, fmt)
+        if data is None:
+            return _send_cached_img(original)
+        entry = img_cache.put(key, data, f"image/{fmt}")
+    resp = _send_cached_img(entry)
+    resp.vary.add("Accept")
+    return resp
+
 
 @app.get("/proxy/img")
 def proxy_img():
@@ -148,31 +420,33 @@ def proxy_img():
     host_ok = any(host == suf or host.endswith("." + suf) for suf in ALLOWED_IMG_SUFFIXES)
     if not host_ok:
         abort(400, f"host not allowed: {host}")
+    width = snap_width(request.args.get("w"))
 
-    headers = IMG_HEADERS.copy()
-    ref = _referer_for_host(host)
-    if ref:
-        headers["Referer"] = ref
+    cached = img_cache.get(src)
+    if not (cached and img_cache.is_fresh(cached)):
+        r = _fetch_upstream_img(src, host, cached)
+        if r is not None:
+            if not width:
+                return _stream_img(src, r)
+            cached = _download_img(src, r)
 
-    try:
-        r = requests.get(src, timeout=10, headers=headers, stream=True)
-    except requests.RequestException:
-        abort(502)
-
-    ctype = r.headers.get("Content-Type", "")
-    if r.status_code != 200 or not ctype.startswith("image/"):
-        abort(502)
-
-    return Response(r.content, headers={
-        "Content-Type": ctype,
-        "Cache-Control": "public, max-age=86400",
-    })
+    if width:
+        return _send_thumbnail(src, cached, width)
+    return _send_cached_img(cached)
 
 
 def proxied(url: str | None) -> str | None:
     return f"/proxy/img?u={requote_uri(url)}" if url else None
 
 
+@app.template_filter('thumb')
+def thumb(url: str | None, width: int = 240) -> str | None:
+    """Ask the image proxy for a resized variant of an already proxied URL"""
+    if url and url.startswith("/proxy/img?") and "&w=" not in url:
+        return f"{url}&w={width}"
+    return url
+
+
 @app.get("/debug/allow")
 def debug_allow():
     src = request.args.get("u", "")
@@ -182,10 +456,44 @@ def debug_allow():
     return jsonify({"host": host, "allowed": ok, "suffixes": ALLOWED_IMG_SUFFIXES})
 
 
+@app.get("/debug/scrapers")
+def debug_scrapers():
+    """Per-platform scrape counters for this worker process"""
+    return jsonify(scraper_stats())
+
+
+@app.get("/debug/breakers")
+def debug_breakers():
+    """Per-host circuit breaker state for this worker process"""
+    return jsonify(breaker.states())
+
+
+@app.get("/debug/scrape-cache")
+def debug_scrape_cache():
+    """Shared scrape cache hit/miss counters (all processes)"""
+    return jsonify(scrape_cache.stats())
+
+
 # =====================================================================
 # Email Functions
 # =====================================================================
+# All mail goes through one background Mailer per process (utils/notifier.py):
+# a persistent authenticated SMTP connection drains a queue, so callers never
+# block on SMTP and a burst of alerts shares one TLS handshake and login.
+# Created lazily so it is never inherited across a fork.
+_mailer = None
+
+
+def get_mailer():
+    global _mailer
+    if _mailer is None:
+        _mailer = Mailer(SMTP_HOST, SMTP_PORT, GMAIL_USER, GMAIL_PASS,
+                         security=SMTP_SECURITY, max_per_session=SMTP_MAX_PER_SESSION)
+    return _mailer
+
+
 def send_price_alert(to_email, title, product_url, image_url, current_price, target_price):
+    """Queue a price-drop email; returns the delivery Future (None if it could not be built)"""
     try:
         msg = MIMEMultipart("alternative")
         msg["From"] = f"PriceGenius Alerts <{GMAIL_USER}>"
@@ -277,14 +585,11 @@ def send_price_alert(to_email, title, product_url, image_url, current_price, tar
 """
 
         msg.attach(MIMEText(html, "html"))
-
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(GMAIL_USER, GMAIL_PASS)
-            server.send_message(msg)
+        return get_mailer().send(msg)
 
     except Exception as e:
         print("Email error:", e)
+        return None
 
 
 def send_password_reset_email(to_email: str, reset_url: str):
@@ -378,11 +683,8 @@ If you didn't request this, please ignore this email.
         msg.attach(MIMEText(plain, 'plain'))
         msg.attach(MIMEText(html, 'html'))
 
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-            server.login(GMAIL_USER, GMAIL_PASS)
-            server.send_message(msg)
-
-        print(f"Password reset email sent to {to_email}")
+        get_mailer().send(msg)
+        print(f"Password reset email queued for {to_email}")
         return True
     except Exception as e:
         print(f"Failed to send email: {e}")
@@ -409,75 +711,575 @@ def verify_reset_token(token, expiration=3600):
 # =====================================================================
 # Scraping Helper
 # =====================================================================
-def scrape_product_details(url):
-    """Detect platform and scrape product details"""
+# Interactive scrapes (adding a product, "update price") go through a cache
+# shared by every worker and by checker.py / scheduler.py, keyed by canonical
+# URL (utils/scrapecache.py): a page anyone scraped in the last
+# SCRAPE_CACHE_TTL seconds is reused, and a failed one isn't re-fetched until
+# SCRAPE_CACHE_NEGATIVE_TTL passes. The batch refresh always fetches and
+# stores what it gets. SCRAPE_CACHE_TTL=0 turns the cache off.
+scrape_cache = ScrapeCache(
+    path=os.environ.get("SCRAPE_CACHE_PATH", os.path.join(BASE_DIR, "instance", "scrape_cache.db")),
+    ttl=int(os.environ.get("SCRAPE_CACHE_TTL", 600)),
+    negative_ttl=int(os.environ.get("SCRAPE_CACHE_NEGATIVE_TTL", 120)),
+)
+
+
+def cached_scrape(url):
+    """scrape() through the shared cache; None if unsupported or the scrape failed"""
+    key = canonical_url(url)
+    hit, data = scrape_cache.lookup(key)
+    if hit:
+        return ScrapeResult(**data) if data else None
+    res = scrape(key)
+    if (res is None and platform_for(key) is None) or (res and res.deferred):
+        return res  # unsupported, or host circuit open: nothing was fetched
+    scrape_cache.put(key, res.to_dict() if res else None)
+    return res
+
+
+def scrape_product_details(url, listing=None):
+    """Detect platform and scrape product details; None if no price could be scraped.
+
+    A successful result is also applied to listing.
+    """
     try:
-        u = url.lower()
+        res = cached_scrape(url)
+    except Exception as e:
+        print(f"Scraping error for {url}: {e}")
+        return None
+    if not res or res.deferred or res.price is None:
+        return None
+    if listing is not None:
+        listing.apply(res, res.price, fingerprint=False)
+    return {
+        "title": res.title or f"{res.platform} Product",
+        "price": res.price,
+        "image_url": proxied(res.image) if res.image else PLACEHOLDER_IMG,
+        "platform": res.platform,
+        "rating": res.rating,
+        "rating_count": res.rating_count,
+    }
 
-        if 'amazon' in u:
-            try:
-                from scrapers.amazon import get_amazon_product_details
-                res = get_amazon_product_details(url)
-            except Exception as e:
-                print("Amazon scraper import/run error:", e)
-                res = None
-            if res:
-                return {
-                    "title": res.get('title', 'Amazon Product'),
-                    "price": res.get('price', 0.0) or 0.0,
-                    "image_url": proxied(res.get('image')) if res.get('image') else PLACEHOLDER_IMG,
-                    "platform": "Amazon"
-                }
-
-        elif 'flipkart' in u:
-            try:
-                from scrapers.flipkart import get_flipkart_product_details
-                res = get_flipkart_product_details(url)
-            except Exception as e:
-                print("Flipkart scraper import/run error:", e)
-                res = None
-            if res:
-                return {
-                    "title": res.get('title', 'Flipkart Product'),
-                    "price": res.get('price', 0.0) or 0.0,
-                    "image_url": proxied(res.get('image')) if res.get('image') else PLACEHOLDER_IMG,
-                    "platform": "Flipkart"
-                }
-
-        elif 'myntra' in u:
-            try:
-                from scrapers.myntra import get_myntra_product_details
-                res = get_myntra_product_details(url)
-            except Exception as e:
-                print("Myntra scraper import/run error:", e)
-                res = None
-            if res:
-                return {
-                    "title": res.get('title', 'Myntra Product'),
-                    "price": res.get('price', 0.0) or 0.0,
-                    "image_url": proxied(res.get('image')) if res.get('image') else PLACEHOLDER_IMG,
-                    "platform": "Myntra"
-                }
-
-        elif 'meesho.com' in u:
+
+def attach_listings(products, retry=True):
+    """Link products to their shared Listing by canonical URL, creating missing ones"""
+    todo = [p for p in products if p.listing_id is None]
+    if not todo:
+        return
+    canon = {p.id: canonical_url(p.url) for p in todo}
+    wanted = set(canon.values())
+    listings = {l.canonical_url: l for l in Listing.query.filter(Listing.canonical_url.in_(wanted))}
+    for p in todo:
+        url = canon[p.id]
+        if url not in listings:
+            scraped = p.status == 'ready'  # a pending placeholder has nothing worth sharing yet
+            listings[url] = Listing(canonical_url=url, platform=platform_for(url) or p.platform,
+                                    title=p.title if scraped else None,
+                                    current_price=(p.current_price or None) if scraped else None)
+            db.session.add(listings[url])
+        p.listing = listings[url]
+    try:
+        db.session.commit()
+    except IntegrityError:  # another worker created the same listing first
+        db.session.rollback()
+        if not retry:
+            raise
+        attach_listings(products, retry=False)
+
+
+# =====================================================================
+# Price History
+# =====================================================================
+# Raw observations are only written when the price moves. The rollup job
+# then folds raw points older than HISTORY_RAW_DAYS into hourly rows and
+# hourly rows older than HISTORY_HOURLY_DAYS into daily rows.
+HISTORY_RAW_DAYS = int(os.environ.get("HISTORY_RAW_DAYS", 7))
+HISTORY_HOURLY_DAYS = int(os.environ.get("HISTORY_HOURLY_DAYS", 90))
+HISTORY_INSERT_CHUNK = 1000
+HISTORY_ROLLUP_BATCH = int(os.environ.get("HISTORY_ROLLUP_BATCH", 500))  # products per rollup transaction
+
+
+def record_price_point(product, price, rating=None, rating_count=None, force=False):
+    """Queue a PriceHistory row if price differs from product.current_price (caller commits).
+
+    Call before overwriting product.current_price; force writes the first point.
+    """
+    if price is None or (not force and price == product.current_price):
+        return False
+    db.session.add(PriceHistory(
+        product_id=product.id,
+        ts=datetime.utcnow(),
+        price=price,
+        rating=rating,
+        rating_count=rating_count,
+    ))
+    return True
+
+
+def _hour_bucket(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _day_bucket(ts):
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _downsample(source, target, older_than, bucket_of):
+    """Replace `source` rows older than older_than with one `target` row per product/bucket.
+
+    Works through HISTORY_ROLLUP_BATCH products at a time and commits each
+    batch, so memory stays bounded and the write lock is held briefly.
+    """
+    old = db.and_(PriceHistory.resolution == source, PriceHistory.ts < older_than)
+    product_ids = [pid for (pid,) in db.session.query(PriceHistory.product_id)
+                   .filter(old).distinct().order_by(PriceHistory.product_id)]
+    written = 0
+    for i in range(0, len(product_ids), HISTORY_ROLLUP_BATCH):
+        batch = product_ids[i:i + HISTORY_ROLLUP_BATCH]
+        in_batch = db.and_(old, PriceHistory.product_id.between(batch[0], batch[-1]))
+        written += _downsample_batch(in_batch, target, bucket_of)
+        db.session.commit()
+    return written
+
+
+def _downsample_batch(rows_filter, target, bucket_of):
+    rows = (PriceHistory.query
+            .filter(rows_filter)
+            .order_by(PriceHistory.product_id, PriceHistory.ts)
+            .yield_per(5000))
+
+    rollups = []
+    cur = None
+    for r in rows:
+        key = (r.product_id, bucket_of(r.ts))
+        lo = r.price_min if r.price_min is not None else r.price
+        hi = r.price_max if r.price_max is not None else r.price
+        if cur is None or cur['key'] != key:
+            if cur is not None:
+                rollups.append(cur)
+            cur = {'key': key, 'price_min': lo, 'price_max': hi}
+        else:
+            if lo is not None:
+                cur['price_min'] = lo if cur['price_min'] is None else min(cur['price_min'], lo)
+            if hi is not None:
+                cur['price_max'] = hi if cur['price_max'] is None else max(cur['price_max'], hi)
+        # rows arrive in ts order, so the last one seen is the bucket's closing value
+        cur.update(price=r.price, rating=r.rating, rating_count=r.rating_count)
+    if cur is not None:
+        rollups.append(cur)
+
+    if not rollups:
+        return 0
+
+    PriceHistory.query.filter(rows_filter).delete(synchronize_session=False)
+    values = [{
+        'product_id': b['key'][0], 'ts': b['key'][1], 'resolution': target,
+        'price': b['price'], 'price_min': b['price_min'], 'price_max': b['price_max'],
+        'rating': b['rating'], 'rating_count': b['rating_count'],
+    } for b in rollups]
+    for i in range(0, len(values), HISTORY_INSERT_CHUNK):
+        db.session.execute(db.insert(PriceHistory), values[i:i + HISTORY_INSERT_CHUNK])
+    return len(rollups)
+
+
+def rollup_price_history(now=None):
+    """Downsample old price history (raw -> hourly -> daily); returns rows written per step"""
+    now = now or datetime.utcnow()
+    with app.app_context():
+        try:
+            # snap cutoffs to bucket edges so a bucket is never split across two runs;
+            # _downsample commits per batch of products, keeping the write lock short
+            hourly = _downsample('raw', 'hour', _hour_bucket(now - timedelta(days=HISTORY_RAW_DAYS)), _hour_bucket)
+            daily = _downsample('hour', 'day', _day_bucket(now - timedelta(days=HISTORY_HOURLY_DAYS)), _day_bucket)
+        except Exception:
+            db.session.rollback()
+            raise
+    print(f"Price history rollup: {hourly} hourly, {daily} daily rows")
+    return {'hourly': hourly, 'daily': daily}
+
+
+# =====================================================================
+# Alert State
+# =====================================================================
+# A product under its target is alerted once, not on every refresh:
+#   * the first time the price falls to or below the target (the alert "arms" off)
+#   * again only if it drops another ALERT_DROP_PCT below the last alerted price
+#   * it re-arms once the price climbs ALERT_REARM_PCT above the target, so a
+#     price hovering around the target doesn't flap
+#   * never more than once per ALERT_COOLDOWN_HOURS; a suppressed alert is
+#     sent by the first refresh after the cooldown if it is still due
+ALERT_DROP_PCT = float(os.environ.get("ALERT_DROP_PCT", 0.05))
+ALERT_REARM_PCT = float(os.environ.get("ALERT_REARM_PCT", 0.02))
+ALERT_COOLDOWN_HOURS = float(os.environ.get("ALERT_COOLDOWN_HOURS", 24))
+
+
+def alert_due(product, price, now=None):
+    """Advance product's alert state for a newly observed price; True if an email should go out.
+
+    The state is updated as if the alert were sent, so call it before the
+    commit that saves the price and send the email after it.
+    """
+    if not price or not product.target_price:
+        return False
+    if price > product.target_price * (1 + ALERT_REARM_PCT):
+        product.last_alert_price = None
+        return False
+    if price > product.target_price:
+        return False
+    if product.last_alert_price is not None and price > product.last_alert_price * (1 - ALERT_DROP_PCT):
+        return False
+    now = now or datetime.utcnow()
+    if product.last_alert_at and now - product.last_alert_at < timedelta(hours=ALERT_COOLDOWN_HOURS):
+        return False
+    product.last_alert_price = price
+    product.last_alert_at = now
+    return True
+
+
+def _cooled_down(product, price, now=None):
+    """Cheap pre-check for unchanged pages: under target and outside the cooldown"""
+    if not price or not product.target_price or price > product.target_price:
+        return False
+    now = now or datetime.utcnow()
+    return not product.last_alert_at or now - product.last_alert_at >= timedelta(hours=ALERT_COOLDOWN_HOURS)
+
+
+# =====================================================================
+# Background Scrape Queue
+# =====================================================================
+# Adding a product stores a 'pending' placeholder row and hands the slow
+# scrape to this in-process pool, so POST /dashboard returns at once.
+# The pool is created lazily so it is never inherited across a fork.
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", 4))
+PENDING_TITLE = "Fetching product details..."
+_scrape_queue = None
+
+
+def _get_scrape_queue():
+    global _scrape_queue
+    if _scrape_queue is None:
+        _scrape_queue = ThreadPoolExecutor(max_workers=SCRAPE_WORKERS, thread_name_prefix="scrape")
+    return _scrape_queue
+
+
+def enqueue_product_scrape(product_id):
+    return _get_scrape_queue().submit(_complete_pending_product, product_id)
+
+
+def _complete_pending_product(product_id):
+    """Scrape a pending product, fill in its row and send the alert if due"""
+    with app.app_context():
+        product = db.session.get(Product, product_id)
+        if product is None:  # deleted before the job ran
+            return
+        try:
+            attach_listings([product])
+            if breaker.blocked_for(product.listing.canonical_url):
+                return  # host is blocking us: stays pending until a scheduled refresh fills it in
+            product_info = scrape_product_details(product.listing.canonical_url, product.listing)
+            if product_info is None:
+                # keep the placeholder and its platform: the next refresh fills it in (see _apply_refresh)
+                product.status = 'failed'
+                product.last_checked = datetime.utcnow()
+                db.session.commit()
+                return
+            record_price_point(product, product_info['price'], force=True)
+            product.title = product_info['title']
+            product.current_price = product_info['price']
+            product.image_url = product_info['image_url']
+            product.platform = product_info['platform']
+            product.rating = product_info.get('rating')
+            product.rating_count = product_info.get('rating_count')
+            product.last_checked = datetime.utcnow()
+            product.status = 'ready'
+            notify = alert_due(product, product.current_price)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Background scrape failed for product {product_id}: {e}")
+            product = db.session.get(Product, product_id)
+            if product is not None:
+                product.status = 'failed'
+                db.session.commit()
+            return
+
+        if notify:
             try:
-                from scrapers.meesho import get_meesho_product_details
-                res = get_meesho_product_details(url)
+                send_price_alert(
+                    to_email=product.user.email,
+                    title=product.title,
+                    product_url=product.url,
+                    image_url=product.image_url or "",
+                    current_price=product.current_price,
+                    target_price=product.target_price
+                )
             except Exception as e:
-                print("Meesho scraper import/run error:", e)
-                res = None
-            if res:
-                return {
-                    "title": res.get('title', 'Meesho Product'),
-                    "price": res.get('price', 0.0) or 0.0,
-                    "image_url": proxied(res.get('image')) if res.get('image') else PLACEHOLDER_IMG,
-                    "platform": "Meesho"
-                }
-
-        return {"title": "Manual Entry", "price": 0.0, "image_url": PLACEHOLDER_IMG, "platform": "Unknown"}
+                app.logger.warning(f"Alert send failed on add: {e}")
+
+
+# =====================================================================
+# Batch Price Refresh
+# =====================================================================
+# Each Listing (one canonical product page) is scraped once per run and
+# the observed price fans out to every Product that tracks it. Scrapers
+# are network bound: on the async backend (scrapers/aio.py) every listing
+# is in flight at once as a coroutine, capped per host by AIO_PER_HOST;
+# with SCRAPER_BACKEND=threads each platform gets its own small thread pool
+# of REFRESH_CONCURRENCY workers instead.
+REFRESH_CONCURRENCY = int(os.environ.get("REFRESH_CONCURRENCY", 4))
+REFRESH_COMMIT_BATCH = int(os.environ.get("REFRESH_COMMIT_BATCH", 200))
+
+
+def _refresh_one(url, allow_unchanged=True):
+    try:
+        return scrape(url, conditional=allow_unchanged)
     except Exception as e:
-        print(f"Scraping error for {url}: {e}")
-        return {"title": "Product (Failed to fetch details)", "price": 0.0, "image_url": PLACEHOLDER_IMG, "platform": "Unknown"}
+        print(f"Refresh error for {url}: {e}")
+        return None
+
+
+def _apply_refresh(product, info, new_price, force_history):
+    """Copy a scrape result onto one Product; returns True if an alert is due"""
+    record_price_point(product, new_price, info.rating, info.rating_count, force=force_history)
+    product.current_price = new_price
+    product.last_checked = datetime.utcnow()
+    if info.image:
+        product.image_url = proxied(info.image)
+    if info.rating is not None:
+        product.rating = info.rating
+    if info.rating_count is not None:
+        product.rating_count = info.rating_count
+    if product.status != 'ready':  # placeholder whose add-time scrape never finished
+        product.title = (info.title or product.title)[:200]
+        product.status = 'ready'
+    return alert_due(product, new_price)
+
+
+def _send_refresh_alerts(alerts):
+    """Queue mail for alerts whose state was just committed, then empty the list.
+
+    Sent batch by batch: a later failing commit must not swallow alerts
+    that alert_due() already recorded as sent.
+    """
+    for product in alerts:
+        try:
+            send_price_alert(
+                to_email=product.user.email,
+                title=product.title,
+                product_url=product.url,
+                image_url=product.image_url or "",
+                current_price=product.current_price,
+                target_price=product.target_price
+            )
+        except Exception as e:
+            app.logger.warning(f"Alert send failed on refresh: {e}")
+    alerts.clear()
+
+
+def check_prices_and_alert(listing_ids=None):
+    """Refresh tracked listings once each and email alerts for targets reached.
+
+    With listing_ids only those listings are refreshed (the adaptive
+    scheduler); otherwise every product is swept. Every refreshed listing
+    gets its next_check_at planned from the outcome. Returns a summary dict:
+    checked, changed, unchanged, failed and deferred (listings on a host
+    whose circuit is open), products (rows updated) and wall_time (seconds).
+    """
+    started = time.monotonic()
+    summary = {"checked": 0, "changed": 0, "unchanged": 0, "failed": 0, "deferred": 0, "products": 0, "wall_time": 0.0}
+
+    with app.app_context():
+        query = Product.query.options(db.joinedload(Product.user))
+        history = db.session.query(PriceHistory.product_id).distinct()
+        if listing_ids is not None:
+            query = query.filter(Product.listing_id.in_(listing_ids))
+            history = history.join(Product, Product.id == PriceHistory.product_id).filter(
+                Product.listing_id.in_(listing_ids))
+        products = query.all()
+        attach_listings(products)
+        with_history = {pid for (pid,) in history}
+
+        subscribers = {}
+        for p in products:
+            subscribers.setdefault(p.listing, []).append(p)
+
+        pools = {}
+        futures = {}
+        for listing in subscribers:
+            conditional.seed(listing.canonical_url, listing.etag, listing.last_modified, listing.content_hash)
+            platform = listing.platform or "Unknown"
+            # unfinished placeholders need real fields, so never accept "unchanged" for them
+            settled = listing.current_price is not None and all(p.status == 'ready' for p in subscribers[listing])
+            if SCRAPER_BACKEND == "async":
+                futures[submit_scrape(listing.canonical_url, conditional=settled)] = listing
+                continue
+            if platform not in pools:
+                pools[platform] = ThreadPoolExecutor(max_workers=REFRESH_CONCURRENCY,
+                                                     thread_name_prefix=f"refresh-{platform}")
+            futures[pools[platform].submit(_refresh_one, listing.canonical_url, settled)] = listing
+
+        alerts = []
+        unchanged = []
+        fresh = []
+        pending = 0
+        try:
+            # nothing is flushed while waiting on scrapes: the SQLite write lock is
+            # only taken by the short batch commits, so other writers barely wait
+            with db.session.no_autoflush:
+                for fut in as_completed(futures):
+                    listing = futures[fut]
+                    info = fut.result()
+                    summary["checked"] += 1
+                    if info and info.unchanged:
+                        # same page (304 or identical price region): nothing to parse, only reschedule
+                        summary["unchanged"] += 1
+                        unchanged.append(listing.id)
+                        listing.last_checked = datetime.utcnow()
+                        plan_next_check(listing, subscribers[listing], 'unchanged')
+                        # a steady price still owes any alert the cooldown held back
+                        for product in subscribers[listing]:
+                            if _cooled_down(product, listing.current_price) and alert_due(product, listing.current_price):
+                                alerts.append(product)
+                        continue
+                    if info and info.deferred:
+                        # host circuit open: come back once it half-opens, without counting a failure
+                        summary["deferred"] += 1
+                        wait = max(breaker.blocked_for(listing.canonical_url), 60)
+                        listing.next_check_at = datetime.utcnow() + timedelta(seconds=wait * random.uniform(1.0, 1.5))
+                        continue
+                    if not info or info.price is None:
+                        summary["failed"] += 1
+                        plan_next_check(listing, subscribers[listing], 'failed')
+                        continue
+
+                    new_price = info.price
+                    moved = bool(listing.current_price) and new_price != listing.current_price
+                    if new_price != listing.current_price:
+                        summary["changed"] += 1
+                    listing.apply(info, new_price)
+                    fresh.append((listing.canonical_url, info.to_dict()))
+                    plan_next_check(listing, subscribers[listing], 'changed' if moved else 'same')
+
+                    for product in subscribers[listing]:
+                        if _apply_refresh(product, info, new_price, product.id not in with_history):
+                            alerts.append(product)
+                        summary["products"] += 1
+                        pending += 1
+
+                    if pending >= REFRESH_COMMIT_BATCH:
+                        db.session.commit()
+                        _send_refresh_alerts(alerts)  # their alert state is committed: send now
+                        pending = 0
+            if unchanged:
+                Product.query.filter(Product.listing_id.in_(unchanged)).update(
+                    {Product.last_checked: datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+            _send_refresh_alerts(alerts)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            scrape_cache.put_many(fresh)
+            for fut in futures:  # only still-pending ones, after an error
+                fut.cancel()
+            for pool in pools.values():
+                pool.shutdown(wait=False)
+
+    summary["wall_time"] = round(time.monotonic() - started, 3)
+    print(f"Price refresh: {summary}")
+    return summary
+
+
+# =====================================================================
+# Adaptive Refresh Scheduling
+# =====================================================================
+# scheduler.py keeps a heap of listings keyed by next_check_at instead of
+# sweeping everything every 30 minutes. After each refresh the listing's
+# next check is planned from what happened:
+#   * prices that just moved (volatility, an EWMA of "changed") come back sooner
+#   * a price within NEAR_TARGET_PCT above someone's target is checked at the minimum interval
+#   * listings viewed in the last VIEWED_WINDOW_HOURS are checked at least every base interval
+#   * every two checks without a change double the interval (stable/stale pages)
+#   * failures back off exponentially regardless of the above
+REFRESH_BASE_MINUTES = float(os.environ.get("REFRESH_BASE_MINUTES", 30))
+REFRESH_MIN_MINUTES = float(os.environ.get("REFRESH_MIN_MINUTES", 10))
+REFRESH_MAX_MINUTES = float(os.environ.get("REFRESH_MAX_MINUTES", 720))
+NEAR_TARGET_PCT = float(os.environ.get("NEAR_TARGET_PCT", 0.05))
+VIEWED_WINDOW_HOURS = float(os.environ.get("VIEWED_WINDOW_HOURS", 24))
+VIEW_TOUCH_MINUTES = 5  # don't rewrite last_viewed_at on every page load
+
+
+def _near_target(price, products):
+    return any(p.target_price and p.target_price < price <= p.target_price * (1 + NEAR_TARGET_PCT)
+               for p in products)
+
+
+def _next_interval(listing, products, now):
+    """Minutes until the listing's next refresh, from its (already updated) counters"""
+    if listing.fail_count:
+        return min(REFRESH_BASE_MINUTES * 2 ** listing.fail_count, REFRESH_MAX_MINUTES)
+
+    minutes = REFRESH_BASE_MINUTES * 2 ** min(listing.stable_checks // 2, 10)
+    minutes /= 1 + 3 * (listing.volatility or 0.0)
+    if listing.current_price and _near_target(listing.current_price, products):
+        minutes = REFRESH_MIN_MINUTES
+    if listing.last_viewed_at and now - listing.last_viewed_at < timedelta(hours=VIEWED_WINDOW_HOURS):
+        minutes = min(minutes, REFRESH_BASE_MINUTES)
+    return max(REFRESH_MIN_MINUTES, min(minutes, REFRESH_MAX_MINUTES))
+
+
+def plan_next_check(listing, products, outcome, now=None):
+    """Fold one refresh outcome (changed | same | unchanged | failed) into the
+    listing's counters and set next_check_at (caller commits)"""
+    now = now or datetime.utcnow()
+    if outcome == 'failed':
+        listing.fail_count = (listing.fail_count or 0) + 1
+    else:
+        listing.fail_count = 0
+        moved = outcome == 'changed'
+        listing.stable_checks = 0 if moved else (listing.stable_checks or 0) + 1
+        listing.volatility = 0.7 * (listing.volatility or 0.0) + (0.3 if moved else 0.0)
+    minutes = _next_interval(listing, products, now) * random.uniform(0.9, 1.1)  # spread the herd
+    listing.next_check_at = now + timedelta(minutes=minutes)
+
+
+def refresh_schedule(listing_ids=None):
+    """(listing id, next_check_at) for every tracked listing, or just listing_ids.
+
+    Products not linked to a listing yet are linked first; a listing that was
+    never scheduled is due now (datetime.min).
+    """
+    with app.app_context():
+        orphans = Product.query.filter(Product.listing_id.is_(None)).all()
+        if orphans:
+            attach_listings(orphans)
+        query = db.session.query(Listing.id, Listing.next_check_at).filter(Listing.products.any())
+        if listing_ids is not None:
+            query = query.filter(Listing.id.in_(listing_ids))
+        return [(lid, due or datetime.min) for lid, due in query]
+
+
+def mark_listings_viewed(listing_ids, now=None):
+    """Record that a user looked at these listings and pull their next refresh forward.
+
+    Only listings not touched in the last VIEW_TOUCH_MINUTES are written, so
+    most dashboard loads cost one read and no commit.
+    """
+    if not listing_ids:
+        return
+    now = now or datetime.utcnow()
+    stale = [lid for (lid,) in db.session.query(Listing.id).filter(
+        Listing.id.in_(listing_ids),
+        db.or_(Listing.last_viewed_at.is_(None),
+               Listing.last_viewed_at < now - timedelta(minutes=VIEW_TOUCH_MINUTES)))]
+    if not stale:
+        return
+    soon = now + timedelta(minutes=REFRESH_BASE_MINUTES)
+    Listing.query.filter(Listing.id.in_(stale)).update({
+        Listing.last_viewed_at: now,
+        Listing.next_check_at: db.case((Listing.next_check_at > soon, soon), else_=Listing.next_check_at),
+    }, synchronize_session=False)
+    db.session.commit()
 
 
 # =====================================================================
@@ -626,43 +1428,62 @@ def dashboard():
             flash("This product is already being tracked.", 'warning')
             return redirect(url_for('dashboard'))
 
-        product_info = scrape_product_details(url)
         new_product = Product(
             user_id=current_user.id,
             url=url,
-            title=product_info['title'],
-            current_price=product_info['price'],
+            title=PENDING_TITLE,
+            current_price=0.0,
             target_price=target_price,
-            image_url=product_info['image_url'],
-            platform=product_info['platform']
+            image_url=PLACEHOLDER_IMG,
+            platform=platform_for(url) or "Unknown",
+            status='pending'
         )
         db.session.add(new_product)
-        db.session.commit()
-
-        if new_product.current_price and new_product.target_price and new_product.current_price <= new_product.target_price:
-            try:
-                send_price_alert(
-                    to_email=current_user.email,
-                    title=new_product.title,
-                    product_url=new_product.url,
-                    image_url=new_product.image_url or "",
-                    current_price=new_product.current_price,
-                    target_price=new_product.target_price
-                )
-            except Exception as e:
-                app.logger.warning(f"Alert send failed on add: {e}")
+        try:
+            db.session.commit()
+        except IntegrityError:  # double submit raced past the check above
+            db.session.rollback()
+            flash("This product is already being tracked.", 'warning')
+            return redirect(url_for('dashboard'))
+        enqueue_product_scrape(new_product.id)
 
-        flash(f"Product '{product_info['title']}' added successfully!", 'success')
+        flash("Product added! Fetching its details in the background...", 'success')
         return redirect(url_for('dashboard'))
 
-    products = Product.query.filter_by(user_id=current_user.id).order_by(Product.created_at.desc()).all()
-    stats = {
-        'total_products': len(products),
-        'targets_reached': sum(1 for p in products if p.current_price and p.target_price and p.current_price <= p.target_price),
-        'potential_savings': sum((p.target_price - p.current_price) for p in products if p.current_price and p.target_price and p.current_price < p.target_price),
+    stats = dashboard_stats(current_user.id)
+    page = request.args.get('page', 1, type=int)
+    products = Product.query.filter_by(user_id=current_user.id) \
+        .order_by(Product.created_at.desc(), Product.id.desc()) \
+        .paginate(page=page, per_page=DASHBOARD_PAGE_SIZE, error_out=False, count=False)
+    products.total = stats['total_products']  # already counted by dashboard_stats()
+    if not products.items and products.pages and page > products.pages:
+        return redirect(url_for('dashboard', page=products.pages))
+    try:
+        mark_listings_viewed({p.listing_id for p in products.items if p.listing_id})
+    except Exception as e:  # never fail the page over scheduling bookkeeping
+        db.session.rollback()
+        app.logger.warning(f"Could not mark listings viewed: {e}")
+    return render_template("dashboard.html", user=current_user, products=products.items,
+                           pagination=products, stats=stats)
+
+
+def dashboard_stats(user_id):
+    """Dashboard totals for one user, aggregated in a single SQL query"""
+    priced = db.and_(Product.current_price > 0, Product.target_price > 0)
+    total, reached, savings = db.session.query(
+        db.func.count(Product.id),
+        db.func.count(db.case((db.and_(priced, Product.current_price <= Product.target_price), 1))),
+        db.func.coalesce(db.func.sum(db.case(
+            (db.and_(priced, Product.current_price < Product.target_price),
+             Product.target_price - Product.current_price),
+            else_=0.0)), 0.0),
+    ).filter(Product.user_id == user_id).one()
+    return {
+        'total_products': total,
+        'targets_reached': reached,
+        'potential_savings': savings,
         'avg_savings_rate': 0
     }
-    return render_template("dashboard.html", user=current_user, products=products, stats=stats)
 
 
 @app.route('/search')
@@ -676,6 +1497,19 @@ def search():
     return render_template("search_results.html", query=query, results=results)
 
 
+@app.get('/api/products/status')
+@login_required
+def products_status():
+    """Status of the given product ids (comma separated), for dashboard polling"""
+    ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip().isdigit()]
+    if not ids:
+        return jsonify({})
+    rows = (db.session.query(Product.id, Product.status)
+            .filter(Product.user_id == current_user.id, Product.id.in_(ids))
+            .all())
+    return jsonify({str(pid): status for pid, status in rows})
+
+
 @app.route("/delete/<int:product_id>")
 @login_required
 def delete_product(product_id):
@@ -683,6 +1517,7 @@ def delete_product(product_id):
     if product.user_id != current_user.id:
         flash("You are not authorized to delete this product.", 'error')
         return redirect(url_for("dashboard"))
+    PriceHistory.query.filter_by(product_id=product.id).delete(synchronize_session=False)
     db.session.delete(product)
     db.session.commit()
     flash("Product deleted successfully.", 'success')
@@ -726,31 +1561,34 @@ def update_price(product_id):
         return redirect(url_for('dashboard'))
 
     try:
-        u = product.url.lower()
-        if 'amazon' in u:
-            from scrapers.amazon import get_amazon_product_details
-            info = get_amazon_product_details(product.url)
-        elif 'flipkart' in u:
-            from scrapers.flipkart import get_flipkart_product_details
-            info = get_flipkart_product_details(product.url)
-        elif 'myntra' in u:
-            from scrapers.myntra import get_myntra_product_details
-            info = get_myntra_product_details(product.url)
-        elif 'meesho.com' in u:
-            from scrapers.meesho import get_meesho_product_details
-            info = get_meesho_product_details(product.url)
-        else:
+        if platform_for(product.url) is None:
             flash('Unsupported platform.', 'error')
             return redirect(url_for('dashboard'))
 
-        if info and (info.get('price') is not None):
-            product.current_price = float(info['price'])
+        info = cached_scrape(product.url)
+        if info and (info.price is not None):
+            attach_listings([product])
+            listing = product.listing
+            moved = bool(listing.current_price) and info.price != listing.current_price
+            listing.apply(info, info.price, fingerprint=False)
+            if moved:  # a same-price answer may be a cache hit the refresh already counted
+                plan_next_check(listing, listing.products, 'changed')
+            record_price_point(product, info.price, info.rating, info.rating_count)
+            product.current_price = info.price
             product.last_checked = datetime.utcnow()
-            if info.get('image'):
-                product.image_url = proxied(info['image'])
+            if info.image:
+                product.image_url = proxied(info.image)
+            if info.rating is not None:
+                product.rating = info.rating
+            if info.rating_count is not None:
+                product.rating_count = info.rating_count
+            if product.status != 'ready':  # its add-time scrape failed
+                product.title = (info.title or product.title)[:200]
+                product.status = 'ready'
+            notify = alert_due(product, info.price)
             db.session.commit()
 
-            if product.target_price and product.current_price and product.current_price <= product.target_price:
+            if notify:
                 try:
                     send_price_alert(
                         to_email=current_user.email,
@@ -767,8 +1605,6 @@ def update_price(product_id):
         else:
             flash('Unable to fetch current price.', 'warning')
 
-    except ImportError as e:
-        flash(f'Scraper import error: {e}', 'error')
     except Exception as e:
         flash(f'Error updating price: {e}', 'error')
 
@@ -0,0 +1,346 @@
+# benchmarks/parse_bench.py
+"""
+Offline scraper benchmark over synthetic product pages.
+
+The fixtures in benchmarks/fixtures/ are hand-built, not saved from the
+live sites: each mimics its platform's markup (JSON-LD, price spans and
+meta tags, state JSON) and is padded with generated navigation, carousels
+with decoy prices and vendor JS to a realistic size. They measure speed and
+guard the parsers against regressions, but cannot catch drift against real
+markup; a saved real page can be dropped in and listed in expected.json.
+
+Every fixture is run through its platform's scraper with HTTP stubbed out
+(get_session and the asyncio backend's httpx client serve the page,
+throttling is a no-op and real sockets are refused), then checked against
+expected.json.
+Reports pages/sec, p50/p99 parse time, peak traced memory, how much of each
+page was actually downloaded and per-field correctness, and can gate on
+both against a saved baseline.
+
+    python -m benchmarks.parse_bench                     # full fetch path (get_*_product_details)
+    python -m benchmarks.parse_bench --mode async        # scrape_async() on the aio.py backend
+    python -m benchmarks.parse_bench --mode parse        # parse_*_html only
+    python -m benchmarks.parse_bench -p croma -n 200
+    python -m benchmarks.parse_bench --save bench.json   # record a baseline
+    python -m benchmarks.parse_bench --baseline bench.json --max-slowdown 0.2
+
+Exit status is 1 when any fixture extracts the wrong value or a platform
+is slower than the baseline by more than --max-slowdown.
+"""
+from __future__ import annotations
+import argparse, asyncio, contextlib, io, json, math, os, statistics, sys, time, tracemalloc
+from unittest import mock
+
+import httpx
+import requests
+
+from scrapers import amazon, flipkart, myntra, meesho, croma, ajio, nykaa, aio, breaker
+from scrapers.registry import scraper_for, scrape_async
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIELDS = ("title", "price", "image", "rating", "rating_count")
+
+MODULES = {
+    "Amazon": amazon, "Flipkart": flipkart, "Myntra": myntra, "Meesho": meesho,
+    "Croma": croma, "Ajio": ajio, "Nykaa": nykaa,
+}
+PARSERS = {
+    "Amazon": amazon.parse_amazon_html,
+    "Flipkart": flipkart.parse_flipkart_html,
+    "Myntra": myntra.parse_myntra_html,
+    "Meesho": meesho.parse_meesho_html,
+    "Croma": croma.parse_croma_html,
+    "Ajio": ajio.parse_ajio_html,
+    "Nykaa": nykaa.parse_nykaa_html,
+}
+
+
+# ---- HTTP stub ---------------------------------------------------------------
+class StubResponse:
+    """Just enough of requests.Response for the scrapers."""
+
+    def __init__(self, url: str, body: bytes, status_code: int = 200):
+        self.url = url
+        self.content = body
+        self.status_code = status_code
+        self.headers = {"Content-Type": "text/html; charset=utf-8"}
+        self.encoding = "utf-8"
+        self.bytes_read = 0
+
+    @property
+    def text(self) -> str:
+        self.bytes_read = len(self.content)
+        return self.content.decode(self.encoding, "replace")
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for {self.url}", response=self)
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False):
+        for i in range(0, len(self.content), chunk_size):
+            chunk = self.content[i:i + chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class StubSession:
+    """Serves one saved page for every request, whatever the URL."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.responses = []
+
+    def get(self, url, **kwargs):
+        r = StubResponse(url, self.body)
+        self.responses.append(r)
+        return r
+
+    @property
+    def bytes_read(self) -> int:
+        return sum(r.bytes_read for r in self.responses)
+
+    def request(self, method, url, **kwargs):
+        return self.get(url, **kwargs)
+
+
+def _refuse_network(*args, **kwargs):
+    raise RuntimeError("network access attempted during offline benchmark")
+
+
+@contextlib.contextmanager
+def stubbed_http(body: bytes):
+    """Point every scraper module's get_session/throttle at the saved page, with fresh circuit breakers."""
+    session = StubSession(body)
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.object(requests.adapters.HTTPAdapter, "send", _refuse_network))
+        stack.enter_context(mock.patch.dict(breaker._circuits, clear=True))  # repeated walls must not trip it
+        for mod in MODULES.values():
+            stack.enter_context(mock.patch.object(mod, "get_session", lambda *a, **k: session))
+            stack.enter_context(mock.patch.object(mod, "throttle", lambda *a, **k: 0.0))
+        yield session
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    """The saved page as an httpx body, counting what the scraper actually pulls."""
+
+    def __init__(self, stub: "AsyncStub", body: bytes, chunk_size: int = 16 * 1024):
+        self.stub, self.body, self.chunk_size = stub, body, chunk_size
+
+    async def __aiter__(self):
+        for i in range(0, len(self.body), self.chunk_size):
+            chunk = self.body[i:i + self.chunk_size]
+            self.stub.bytes_read += len(chunk)
+            yield chunk
+
+
+class AsyncStub:
+    """One httpx client for the whole run (building one per call would dominate the timings)."""
+
+    def __init__(self):
+        self.body = b""
+        self.bytes_read = 0
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Type": "text/html; charset=utf-8"},
+                              stream=_CountingStream(self, self.body))
+
+
+_async_stub: AsyncStub | None = None
+
+
+async def _no_throttle(url: str) -> float:
+    return 0.0
+
+
+@contextlib.contextmanager
+def stubbed_aio(body: bytes):
+    """Serve the saved page to aio.download() through an httpx MockTransport."""
+    global _async_stub
+    if _async_stub is None:
+        _async_stub = AsyncStub()
+    _async_stub.body, _async_stub.bytes_read = body, 0
+    with mock.patch.object(aio, "_client", _async_stub.client), \
+            mock.patch.object(aio, "_in_flight", asyncio.Semaphore(aio.MAX_IN_FLIGHT)), \
+            mock.patch.object(aio, "throttle", _no_throttle):
+        yield _async_stub
+
+
+# ---- fixtures ----------------------------------------------------------------
+def load_fixtures(platforms: set[str] | None = None) -> list[dict]:
+    with open(os.path.join(FIXTURES, "expected.json"), encoding="utf-8") as f:
+        spec = json.load(f)
+    out = []
+    for name, case in sorted(spec.items()):
+        s = scraper_for(case["url"])
+        if s is None or (platforms and s.platform.lower() not in platforms):
+            continue
+        with open(os.path.join(FIXTURES, name), "rb") as f:
+            body = f.read()
+        out.append(dict(case, name=name, platform=s.platform, fetch=s.fetch, body=body))
+    return out
+
+
+def _same(got, want) -> bool:
+    if isinstance(want, float) or isinstance(got, float):
+        return got is not None and want is not None and math.isclose(got, want, abs_tol=0.01)
+    return got == want
+
+
+def check(result: dict | None, expected: dict | None) -> list[str]:
+    """Mismatched fields as 'field: got != want' strings (empty when correct)."""
+    if expected is None:
+        return [] if result is None else [f"expected no result (blocked page), got {result}"]
+    if result is None:
+        return ["no result"]
+    return [f"{k}: {result.get(k)!r} != {expected.get(k)!r}"
+            for k in FIELDS if not _same(result.get(k), expected.get(k))]
+
+
+# ---- runner ------------------------------------------------------------------
+def _call(case: dict, mode: str):
+    """(result, bytes of the page the scraper actually read)"""
+    if mode == "parse":
+        return PARSERS[case["platform"]](case["body"].decode("utf-8"), case["url"]), len(case["body"])
+    if mode == "async":  # Meesho and Croma still run their blocking fetchers, on get_session
+        with stubbed_http(case["body"]) as session, stubbed_aio(case["body"]) as stub:
+            res = aio.run(scrape_async(case["url"]))
+        return (res.to_dict() if res else None), session.bytes_read + stub.bytes_read
+    with stubbed_http(case["body"]) as session:
+        result = case["fetch"](case["url"])
+    return result, session.bytes_read
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def run_case(case: dict, mode: str, repeat: int, warmup: int) -> dict:
+    quiet = io.StringIO()  # scrapers print() on blocked pages; keep the report readable
+    with contextlib.redirect_stdout(quiet):
+        result, read = _call(case, mode)
+        for _ in range(warmup):
+            _call(case, mode)
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            _call(case, mode)
+            times.append(time.perf_counter() - t0)
+        # separate pass: tracemalloc slows everything down, so it never touches the timings
+        tracemalloc.start()
+        _call(case, mode)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "fixture": case["name"],
+        "platform": case["platform"],
+        "bytes": len(case["body"]),
+        "read": read,
+        "errors": check(result, case["expected"]),
+        "times": times,
+        "peak_kb": peak / 1024,
+    }
+
+
+def summarize(runs: list[dict]) -> dict[str, dict]:
+    by_platform: dict[str, list[dict]] = {}
+    for r in runs:
+        by_platform.setdefault(r["platform"], []).append(r)
+    out = {}
+    for platform, rs in sorted(by_platform.items()):
+        times = [t for r in rs for t in r["times"]]
+        out[platform] = {
+            "fixtures": len(rs),
+            "correct": sum(1 for r in rs if not r["errors"]),
+            "pages_per_sec": len(times) / sum(times) if times else 0.0,
+            "p50_ms": statistics.median(times) * 1000 if times else 0.0,
+            "p99_ms": _percentile(times, 99) * 1000 if times else 0.0,
+            "peak_kb": max(r["peak_kb"] for r in rs),
+            "read_pct": 100 * sum(r["read"] for r in rs) / max(1, sum(r["bytes"] for r in rs)),
+        }
+    return out
+
+
+def print_report(runs: list[dict], summary: dict[str, dict], mode: str) -> None:
+    print(f"mode={mode}")
+    print(f"{'platform':<10}{'fixtures':>9}{'correct':>9}{'pages/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'peak KiB':>10}{'read %':>8}")
+    for platform, s in summary.items():
+        print(f"{platform:<10}{s['fixtures']:>9}{s['correct']:>9}{s['pages_per_sec']:>10.1f}"
+              f"{s['p50_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['peak_kb']:>10.0f}{s['read_pct']:>8.0f}")
+    for r in runs:
+        for err in r["errors"]:
+            print(f"  MISMATCH {r['fixture']}: {err}")
+
+
+def compare(summary: dict[str, dict], baseline: dict[str, dict], max_slowdown: float) -> list[str]:
+    """Platforms whose throughput fell more than max_slowdown below the baseline."""
+    regressions = []
+    for platform, s in summary.items():
+        base = baseline.get(platform)
+        if not base or not base.get("pages_per_sec"):
+            continue
+        ratio = s["pages_per_sec"] / base["pages_per_sec"]
+        if ratio < 1 - max_slowdown:
+            regressions.append(f"{platform}: {s['pages_per_sec']:.1f} pages/s vs "
+                               f"{base['pages_per_sec']:.1f} baseline ({(1 - ratio) * 100:.0f}% slower)")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--mode", choices=("fetch", "async", "parse"), default="fetch",
+                    help="fetch: get_*_product_details with stubbed HTTP; async: scrape_async() "
+                         "with a stubbed httpx client; parse: parse_*_html only")
+    ap.add_argument("-p", "--platform", action="append", help="limit to a platform (repeatable)")
+    ap.add_argument("-n", "--repeat", type=int, default=50, help="timed runs per fixture")
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--save", help="write the summary as JSON (use as a later --baseline)")
+    ap.add_argument("--baseline", help="summary JSON from an earlier --save to compare against")
+    ap.add_argument("--max-slowdown", type=float, default=0.2,
+                    help="allowed throughput drop vs --baseline (0.2 = 20%%)")
+    args = ap.parse_args(argv)
+
+    platforms = {p.lower() for p in args.platform} if args.platform else None
+    cases = load_fixtures(platforms)
+    if args.mode == "parse":
+        cases = [c for c in cases if not c.get("blocked")]  # bot walls are caught by the fetch path
+    if not cases:
+        print("no fixtures selected")
+        return 1
+
+    runs = [run_case(c, args.mode, args.repeat, args.warmup) for c in cases]
+    summary = summarize(runs)
+    print_report(runs, summary, args.mode)
+
+    failed = any(r["errors"] for r in runs)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for line in compare(summary, baseline.get(args.mode, {}), args.max_slowdown):
+            print(f"  SLOWER {line}")
+            failed = True
+    if args.save:
+        saved = {}
+        if os.path.exists(args.save):
+            with open(args.save, encoding="utf-8") as f:
+                saved = json.load(f)
+        saved[args.mode] = summary
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(saved, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,6 @@
 from app import check_prices_and_alert
+from scrapers import pipeline
 
-check_prices_and_alert()
+if __name__ == "__main__":  # parser processes re-import this module
+    pipeline.start()
+    check_prices_and_alert()
@@ -0,0 +1,26 @@
+"""Add product status
+
+Revision ID: 1b18f634d70f
+Revises: 4b8acf43d174
+Create Date: 2026-10-16 10:12:41.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b18f634d70f'
+down_revision = '4b8acf43d174'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), server_default='ready', nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_column('status')
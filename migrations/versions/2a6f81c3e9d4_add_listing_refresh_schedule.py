@@ -0,0 +1,37 @@
+"""Add adaptive refresh scheduling to listing
+
+Revision ID: 2a6f81c3e9d4
+Revises: 7d2e4b9a1c05
+Create Date: 2026-10-16 23:48:12.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a6f81c3e9d4'
+down_revision = '7d2e4b9a1c05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # next_check_at starts NULL, which the scheduler treats as due now
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_check_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('fail_count', sa.Integer(), server_default='0', nullable=True))
+        batch_op.add_column(sa.Column('stable_checks', sa.Integer(), server_default='0', nullable=True))
+        batch_op.add_column(sa.Column('volatility', sa.Float(), server_default='0', nullable=True))
+        batch_op.add_column(sa.Column('last_viewed_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_listing_next_check_at'), ['next_check_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_listing_next_check_at'))
+        batch_op.drop_column('last_viewed_at')
+        batch_op.drop_column('volatility')
+        batch_op.drop_column('stable_checks')
+        batch_op.drop_column('fail_count')
+        batch_op.drop_column('next_check_at')
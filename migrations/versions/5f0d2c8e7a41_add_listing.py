@@ -0,0 +1,47 @@
+"""Add shared listing
+
+Revision ID: 5f0d2c8e7a41
+Revises: 9c3e5a71d2b8
+Create Date: 2026-10-16 11:47:05.204417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0d2c8e7a41'
+down_revision = '9c3e5a71d2b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'listing',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('canonical_url', sa.String(length=300), nullable=False),
+        sa.Column('platform', sa.String(length=50), nullable=True),
+        sa.Column('title', sa.String(length=200), nullable=True),
+        sa.Column('current_price', sa.Float(), nullable=True),
+        sa.Column('image_url', sa.String(length=600), nullable=True),
+        sa.Column('rating', sa.Float(), nullable=True),
+        sa.Column('rating_count', sa.Integer(), nullable=True),
+        sa.Column('last_checked', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('canonical_url')
+    )
+    # existing products are linked lazily by the next batch refresh
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('listing_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_product_listing_id'), ['listing_id'], unique=False)
+        batch_op.create_foreign_key('fk_product_listing_id', 'listing', ['listing_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_product_listing_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_product_listing_id'))
+        batch_op.drop_column('listing_id')
+
+    op.drop_table('listing')
@@ -0,0 +1,30 @@
+"""Add conditional-fetch validators to listing
+
+Revision ID: 7d2e4b9a1c05
+Revises: 5f0d2c8e7a41
+Create Date: 2026-10-16 23:20:41.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2e4b9a1c05'
+down_revision = '5f0d2c8e7a41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('etag', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('last_modified', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=40), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('listing', schema=None) as batch_op:
+        batch_op.drop_column('content_hash')
+        batch_op.drop_column('last_modified')
+        batch_op.drop_column('etag')
@@ -0,0 +1,42 @@
+"""Add price history
+
+Revision ID: 9c3e5a71d2b8
+Revises: 1b18f634d70f
+Create Date: 2026-10-16 11:02:19.550871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5a71d2b8'
+down_revision = '1b18f634d70f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'price_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('ts', sa.DateTime(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('price_min', sa.Float(), nullable=True),
+        sa.Column('price_max', sa.Float(), nullable=True),
+        sa.Column('rating', sa.Float(), nullable=True),
+        sa.Column('rating_count', sa.Integer(), nullable=True),
+        sa.Column('resolution', sa.String(length=8), server_default='raw', nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.create_index('ix_price_history_product_ts', ['product_id', 'ts'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('price_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_price_history_product_ts')
+
+    op.drop_table('price_history')
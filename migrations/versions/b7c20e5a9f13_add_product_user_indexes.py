@@ -0,0 +1,35 @@
+"""Index product by user and make (user_id, url) unique
+
+Revision ID: b7c20e5a9f13
+Revises: e41b7c9d2f60
+Create Date: 2026-10-17 10:31:05.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c20e5a9f13'
+down_revision = 'e41b7c9d2f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the old check-then-insert could race; keep the oldest row of any duplicate pair
+    op.execute(
+        "DELETE FROM price_history WHERE product_id IN ("
+        "SELECT id FROM product WHERE id NOT IN (SELECT MIN(id) FROM product GROUP BY user_id, url))"
+    )
+    op.execute("DELETE FROM product WHERE id NOT IN (SELECT MIN(id) FROM product GROUP BY user_id, url)")
+
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_product_user_url', ['user_id', 'url'])
+        batch_op.create_index('ix_product_user_created', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_user_created')
+        batch_op.drop_constraint('uq_product_user_url', type_='unique')
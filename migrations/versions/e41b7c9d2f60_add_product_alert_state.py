@@ -0,0 +1,35 @@
+"""Add price alert state to product
+
+Revision ID: e41b7c9d2f60
+Revises: 2a6f81c3e9d4
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41b7c9d2f60'
+down_revision = '2a6f81c3e9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_alert_price', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('last_alert_at', sa.DateTime(), nullable=True))
+
+    # products already under target have been emailed on every refresh so far;
+    # start them disarmed instead of sending one more alert after the upgrade
+    op.execute(
+        "UPDATE product SET last_alert_price = current_price "
+        "WHERE target_price IS NOT NULL AND current_price > 0 AND current_price <= target_price"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_column('last_alert_at')
+        batch_op.drop_column('last_alert_price')
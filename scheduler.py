@@ -1,12 +1,75 @@
+import heapq
+import os
 import time
+from datetime import datetime, timedelta
 import schedule
-from app import check_prices_and_alert
+from app import check_prices_and_alert, rollup_price_history, refresh_schedule
+from scrapers import pipeline
 
-# Define how often to run the checker
-schedule.every(30).minutes.do(check_prices_and_alert)  # 🔁 You can change to 10, 60, etc.
+# Listings are refreshed when they fall due (see "Adaptive Refresh Scheduling" in app.py)
+# rather than in one fixed 30-minute sweep.
+SYNC_SECONDS = int(os.environ.get("SCHEDULER_SYNC_SECONDS", 60))  # pick up new products / page views
+BATCH_SIZE = int(os.environ.get("SCHEDULER_BATCH", 50))            # listings refreshed per round
 
-print("🔄 Price tracker scheduler started...")
 
-while True:
-    schedule.run_pending()
-    time.sleep(1)
+class RefreshQueue:
+    """Min-heap of (next_check_at, listing_id) with lazy invalidation"""
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}  # listing_id -> the due time its live heap entry carries
+
+    def __len__(self):
+        return len(self._due)
+
+    def sync(self, rows, complete=False):
+        """Merge (listing_id, due) rows; with complete=True drop listings not in rows"""
+        seen = set()
+        for lid, due in rows:
+            seen.add(lid)
+            if self._due.get(lid) != due:
+                self._due[lid] = due
+                heapq.heappush(self._heap, (due, lid))
+        if complete:
+            for lid in set(self._due) - seen:
+                del self._due[lid]  # its heap entry is skipped when popped
+
+    def pop_due(self, now, limit):
+        ids = []
+        while self._heap and len(ids) < limit and self._heap[0][0] <= now:
+            due, lid = heapq.heappop(self._heap)
+            if self._due.get(lid) == due:  # otherwise superseded or removed
+                del self._due[lid]
+                ids.append(lid)
+        return ids
+
+
+def main():
+    schedule.every().day.at("03:00").do(rollup_price_history)  # 📉 downsample old price history
+
+    workers = pipeline.start()  # parse pages on every core (see scrapers/pipeline.py)
+    print(f"🔄 Price tracker scheduler started ({workers} parser processes)...")
+
+    queue = RefreshQueue()
+    next_sync = 0.0
+    while True:
+        schedule.run_pending()
+        if time.monotonic() >= next_sync:
+            queue.sync(refresh_schedule(), complete=True)
+            next_sync = time.monotonic() + SYNC_SECONDS
+
+        due = queue.pop_due(datetime.utcnow(), BATCH_SIZE)
+        if not due:
+            time.sleep(1)
+            continue
+        try:
+            check_prices_and_alert(due)
+            queue.sync(refresh_schedule(due))
+        except Exception as e:
+            print(f"Refresh round failed: {e}")
+            retry_at = datetime.utcnow() + timedelta(seconds=SYNC_SECONDS)
+            queue.sync([(lid, retry_at) for lid in due])
+
+
+if __name__ == "__main__":  # parser processes re-import this module
+    main()
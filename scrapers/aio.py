@@ -0,0 +1,174 @@
+# scrapers/aio.py
+"""
+Asyncio fetch backend for the scrapers.
+
+A single background thread runs one event loop per process and owns one
+httpx.AsyncClient, so keep-alive connections are pooled across calls. An
+in-flight fetch is a coroutine rather than a thread, which lets the
+refresh keep thousands of product pages going at once on a single core:
+
+  * per-host concurrency is capped by a semaphore (AIO_PER_HOST), on top of
+    the token-bucket pacing in ratelimit.py (throttle() here awaits instead
+    of sleeping a thread);
+  * AIO_MAX_IN_FLIGHT caps fetches across all hosts;
+  * like stream.download(), every download goes through the host's
+    circuit breaker (breaker.py);
+  * download() applies the same early-exit streaming as stream.download()
+    and returns the same Download, so scrapers handle both identically.
+    httpx errors are re-raised as requests exceptions for the same reason.
+
+Sync code (Flask routes, the refresh loop) uses submit(), which returns a
+concurrent.futures.Future, or run(), which blocks for the result.
+
+    AIO_PER_HOST          concurrent requests per host (default 4)
+    AIO_MAX_IN_FLIGHT     concurrent requests overall (default 1000)
+    AIO_MAX_CONNECTIONS   sockets in the client pool (default 200)
+    AIO_CONNECT_TIMEOUT   seconds to establish a connection (default 10)
+"""
+from __future__ import annotations
+import asyncio, os, threading
+from concurrent.futures import Future
+from urllib.parse import urlparse
+
+import httpx
+import requests
+
+from . import breaker
+from .ratelimit import bucket_for
+from .stream import CHUNK_SIZE, DRAIN_BELOW, Download, StopMarker, _Scanner
+
+PER_HOST = int(os.environ.get("AIO_PER_HOST", 4))
+MAX_IN_FLIGHT = int(os.environ.get("AIO_MAX_IN_FLIGHT", 1000))
+MAX_CONNECTIONS = int(os.environ.get("AIO_MAX_CONNECTIONS", 200))
+CONNECT_TIMEOUT = float(os.environ.get("AIO_CONNECT_TIMEOUT", 10))
+
+
+class AsyncResponse:
+    """The parts of requests.Response the scrapers use, over an httpx.Response."""
+
+    def __init__(self, r: httpx.Response):
+        self.status_code = r.status_code
+        self.headers = r.headers
+        self.url = str(r.url)
+        self.encoding = r.charset_encoding or "utf-8"
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for {self.url}", response=self)
+
+
+# ---- event loop --------------------------------------------------------------
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_client: httpx.AsyncClient | None = None
+_host_slots: dict[str, asyncio.Semaphore] = {}
+_in_flight: asyncio.Semaphore | None = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start the background loop thread on first use (lazily, so it is never inherited across a fork)."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="scrape-aio", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def submit(coro) -> Future:
+    """Schedule coro on the background loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+
+def run(coro, timeout: float | None = None):
+    """Run coro on the background loop and block until it finishes (sync wrapper for routes)."""
+    return submit(coro).result(timeout)
+
+
+# everything below runs on the background loop
+def _get_client() -> httpx.AsyncClient:
+    global _client, _in_flight
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS // 2),
+            follow_redirects=True,
+        )
+        _in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    return _client
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _slot(host: str) -> asyncio.Semaphore:
+    s = _host_slots.get(host)
+    if s is None:
+        s = _host_slots[host] = asyncio.Semaphore(PER_HOST)
+    return s
+
+
+async def throttle(url: str) -> float:
+    """Await url's host token bucket (see ratelimit.py); returns seconds waited."""
+    wait = bucket_for(url).reserve()
+    if wait > 0:
+        await asyncio.sleep(wait)
+    return wait
+
+
+async def _finish(r: httpx.Response, chunks, complete: bool) -> None:
+    if complete:
+        return
+    try:
+        left = int(r.headers.get("Content-Length", "")) - r.num_bytes_downloaded
+    except ValueError:
+        left = None
+    if left is not None and 0 <= left < DRAIN_BELOW:
+        async for _ in chunks:  # cheap: keep the connection reusable
+            pass
+    # otherwise leaving client.stream() closes the half-read connection
+
+
+async def download(url: str, *, headers: dict | None = None, timeout: float = 20,
+                   walls: tuple[bytes, ...] = (), stop_markers: tuple[StopMarker, ...] = (),
+                   max_bytes: int | None = None) -> Download:
+    """Async counterpart of stream.download(); same early-exit rules, same Download result."""
+    client = _get_client()
+    host = _host(url)
+    async with _in_flight, _slot(host):
+        breaker.acquire(url)  # after the wait: the circuit may have opened meanwhile
+        resp = scan = None
+        try:
+            async with client.stream("GET", url, headers=headers,
+                                     timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT)) as r:
+                resp = AsyncResponse(r)
+                if not 200 <= r.status_code < 300:
+                    return Download(resp)
+                scan = _Scanner(walls, stop_markers, max_bytes)
+                chunks = r.aiter_bytes(CHUNK_SIZE)
+                async for chunk in chunks:
+                    if chunk and scan.feed(chunk):
+                        break
+                await _finish(r, chunks, scan.complete)
+                return scan.result(resp)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(f"{host}: {e}") from e
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(f"{host}: {e}") from e
+        finally:
+            breaker.report(url, resp, scan.wall if scan else None)
+
+
+async def in_thread(url: str, fn, *args):
+    """Run a blocking fetch (platforms that need cloudscraper) in a worker thread, under url's host limit."""
+    async with _slot(_host(url)):
+        return await asyncio.to_thread(fn, *args)
+
+
+async def close() -> None:
+    """Close the pooled client (await on the background loop, e.g. run(close()))."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
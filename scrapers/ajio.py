@@ -1,131 +1,128 @@
-from bs4 import BeautifulSoup
-import requests
-import time
 import re
-import json
+from .extract import Page, Extractor, Field, rule
+from .session import get_session
+from .ratelimit import throttle
+from .conditional import UNCHANGED, request_headers, parse_if_changed
+from .stream import download
+from . import aio
 
-def get_ajio_product_details(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "DNT": "1",
-        "Connection": "keep-alive"
-    }
-    
+def _digits_price(txt):
+    txt = re.sub(r'[^\d]', '', txt.replace('₹', '').replace(',', ''))
     try:
-        time.sleep(2)
-        response = requests.get(url, headers=headers, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Title selectors for AJIO
-        title = None
-        title_selectors = [
-            '.product-title',
-            '.item-title h1',
-            '.ajio-product-name',
-            'h1[data-automation-id="productTitle"]',
-            '.prod-title h1'
-        ]
-        
-        for selector in title_selectors:
-            title_elem = soup.select_one(selector)
-            if title_elem:
-                title = title_elem.get_text().strip()
-                break
-        
-        if not title:
-            return None
-        
-        # Price selectors for AJIO
-        price = None
-        price_selectors = [
-            '.price-current',
-            '.final-price .amount',
-            '.price-display',
-            '[data-automation-id="productPrice"]',
-            '.prod-sp'
-        ]
-        
-        for selector in price_selectors:
-            price_elem = soup.select_one(selector)
-            if price_elem:
-                price_text = price_elem.get_text().strip()
-                price_text = re.sub(r'[^\d]', '', price_text.replace('₹', '').replace(',', ''))
-                try:
-                    price = float(price_text)
-                    break
-                except ValueError:
-                    continue
-        
-        # Image selectors for AJIO
-        image = None
-        image_selectors = [
+        return float(txt)
+    except ValueError:
+        return None
+
+
+def _first_number(txt):
+    m = re.search(r'(\d+\.?\d*)', txt)
+    return float(m.group(1)) if m else None
+
+
+def _count(txt):
+    m = re.search(r'([\d,]+)', txt.replace(',', ''))
+    return int(m.group(1)) if m else None
+
+
+# Selectors are compiled once at import; order is fallback priority
+FIELDS = Extractor(
+    title=Field(
+        rule('.product-title'),
+        rule('.item-title h1'),
+        rule('.ajio-product-name'),
+        rule('h1[data-automation-id="productTitle"]'),
+        rule('.prod-title h1'),
+    ),
+    price=Field(
+        rule('.price-current'),
+        rule('.final-price .amount'),
+        rule('.price-display'),
+        rule('[data-automation-id="productPrice"]'),
+        rule('.prod-sp'),
+        parse=_digits_price,
+    ),
+    image=Field(
+        *(rule(sel, 'src', 'data-src', 'data-original') for sel in (
             '.rilrtl-lazy-img',
             '.product-image img',
             '.img-responsive',
             '[data-automation-id="productImage"]',
-            '.prod-img img'
-        ]
-        
-        for selector in image_selectors:
-            image_elem = soup.select_one(selector)
-            if image_elem:
-                image = (image_elem.get('src') or 
-                        image_elem.get('data-src') or 
-                        image_elem.get('data-original'))
-                if image and 'http' in image:
-                    break
-        
-        # Rating selectors for AJIO
-        rating = None
-        rating_selectors = [
-            '.rating-value',
-            '.prod-rating .rating',
-            '[data-automation-id="rating"]'
-        ]
-        
-        for selector in rating_selectors:
-            rating_elem = soup.select_one(selector)
-            if rating_elem:
-                rating_text = rating_elem.get_text()
-                rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                if rating_match:
-                    try:
-                        rating = float(rating_match.group(1))
-                        break
-                    except ValueError:
-                        continue
-        
-        # Rating count for AJIO
-        rating_count = None
-        count_selectors = [
-            '.rating-count',
-            '.prod-rating .count',
-            '[data-automation-id="ratingCount"]'
-        ]
-        
-        for selector in count_selectors:
-            count_elem = soup.select_one(selector)
-            if count_elem:
-                count_text = count_elem.get_text()
-                count_match = re.search(r'([\d,]+)', count_text.replace(',', ''))
-                if count_match:
-                    try:
-                        rating_count = int(count_match.group(1).replace(',', ''))
-                        break
-                    except ValueError:
-                        continue
-        
-        return {
-            'title': title[:200],
-            'price': price,
-            'image': image,
-            'rating': rating,
-            'rating_count': rating_count
-        }
-        
+            '.prod-img img',
+        )),
+        parse=lambda v: v if 'http' in v else None,
+    ),
+    rating=Field(
+        rule('.rating-value'),
+        rule('.prod-rating .rating'),
+        rule('[data-automation-id="rating"]'),
+        parse=_first_number,
+    ),
+    rating_count=Field(
+        rule('.rating-count'),
+        rule('.prod-rating .count'),
+        rule('[data-automation-id="ratingCount"]'),
+        parse=_count,
+    ),
+)
+
+
+# start of the markup hashed to detect an unchanged price (see conditional.py)
+PRICE_MARKERS = ('class="prod-sp', 'class="price-current', 'class="final-price', 'data-automation-id="productPrice"')
+# once all of these have streamed in, the rest of the page is not downloaded (see stream.py)
+STOP_MARKERS = (b'class="prod-sp', b'rilrtl-lazy-img', b'class="prod-rating')
+
+
+def parse_ajio_html(text, url=""):
+    """Extract product details from an AJIO product page."""
+    fields = FIELDS(Page(text, url))
+    if not fields['title']:
+        return None
+
+    return {
+        'title': fields['title'][:200],
+        'price': fields['price'],
+        'image': fields['image'],
+        'rating': fields['rating'],
+        'rating_count': fields['rating_count']
+    }
+
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive"
+}
+
+
+def _result(url, d):
+    response = d.response
+    if response.status_code == 304:
+        return UNCHANGED
+    response.raise_for_status()
+    return parse_if_changed(url, response, d.content, PRICE_MARKERS, parse_ajio_html)
+
+
+def get_ajio_product_details(url):
+    try:
+        throttle(url)
+        d = download(get_session(url), url, headers=request_headers(url, HEADERS), timeout=20,
+                     stop_markers=STOP_MARKERS)
+        return _result(url, d)
+
+    except Exception as e:
+        print(f"AJIO scraping error: {e}")
+        return None
+
+
+async def get_ajio_product_details_async(url):
+    try:
+        await aio.throttle(url)
+        d = await aio.download(url, headers=request_headers(url, HEADERS), timeout=20,
+                               stop_markers=STOP_MARKERS)
+        return _result(url, d)
+
     except Exception as e:
         print(f"AJIO scraping error: {e}")
         return None
@@ -1,7 +1,11 @@
 # scrapers/amazon.py (or wherever you keep it)
-from bs4 import BeautifulSoup
-import requests, time, re, json, html
-from urllib.parse import urlparse
+import requests, re, json, html
+from .extract import Page, Extractor, Field, rule
+from .session import get_session
+from .ratelimit import throttle
+from .conditional import UNCHANGED, request_headers, parse_if_changed
+from .stream import download
+from . import aio
 
 UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -73,8 +77,124 @@ def _clean_amazon_img(url: str) -> str:
     url = re.sub(r"\._[A-Z]{2}\d+.*?_\.", "._SL1000_.", url)
     return url
 
-def get_amazon_product_details(url: str) -> dict | None:
-    headers = {
+def _parse_price(txt: str) -> float | None:
+    txt = re.sub(r"[^\d.,]", "", txt.replace("₹", "").replace("$", ""))
+    try:
+        return float(txt.replace(",", ""))
+    except Exception:
+        return None
+
+
+def _parse_rating(txt: str) -> float | None:
+    m = re.search(r"(\d+(\.\d+)?)", txt)
+    return float(m.group(1)) if m else None
+
+
+def _parse_count(txt: str) -> int | None:
+    m = re.search(r"([\d,]+)", txt)
+    try:
+        return int(m.group(1).replace(",", "")) if m else None
+    except Exception:
+        return None
+
+
+# Selectors are compiled once at import; order is fallback priority
+FIELDS = Extractor(
+    title=Field(
+        rule('#productTitle'), rule('h1#title'), rule('.product-title'), rule('h1.a-size-large'),
+        rule('[data-automation-id="product-title"]'), rule('meta[property="og:title"]'),
+    ),
+    price=Field(
+        rule('.a-price .a-offscreen'),
+        rule('#priceblock_dealprice'), rule('#priceblock_ourprice'), rule('#corePrice_feature_div .a-offscreen'),
+        rule('.a-price .a-price-range .a-price-whole'), rule('.a-price-current .a-offscreen'),
+        rule('meta[property="og:price:amount"]'),
+        parse=_parse_price,
+    ),
+    rating=Field(
+        rule('i[data-hook="average-star-rating"] .a-icon-alt'),
+        rule('.a-icon-star .a-icon-alt'),
+        rule('#acrPopover .a-icon-alt'),
+        rule('.cr-widget-AverageCustomerReviews .a-icon-alt'),
+        parse=_parse_rating,
+    ),
+    rating_count=Field(
+        rule('#acrCustomerReviewText'), rule('[data-hook="total-review-count"]'), rule('.a-link-normal .a-size-base'),
+        parse=_parse_count,
+    ),
+)
+_LANDING = rule("#landingImage, #imgTagWrapperId img, .a-dynamic-image")
+_OG_IMAGE = rule('meta[property="og:image"]')
+_BLOCK_IMAGE = Field(
+    rule('#imageBlock_feature_div img', "data-old-hires", "data-src", "src"),
+    rule('#ebooksImageBlockContainer img', "data-old-hires", "data-src", "src"),
+    rule('#imageBlock img', "data-old-hires", "data-src", "src"),
+)
+
+
+def _extract_image(page: Page) -> str | None:
+    image = None
+
+    # 1) data-a-dynamic-image on landingImage (best)
+    landing = page.first(_LANDING)
+    if landing is not None:
+        dyn = landing.get("data-a-dynamic-image")
+        if dyn:
+            image = _pick_largest_from_dynamic_json(dyn)
+
+        # 2) srcset on main image
+        if not image and landing.get("srcset"):
+            image = _pick_from_srcset(landing.get("srcset"))
+
+        # 3) direct attributes
+        if not image:
+            image = landing.get("data-old-hires") or landing.get("data-src") or landing.get("src")
+
+    # 4) og:image meta fallback
+    if not image:
+        og = page.first(_OG_IMAGE)
+        if og is not None and og.get("content"):
+            image = og.get("content").strip()
+
+    # 5) last resort: any img in block containers
+    if not image:
+        image = _BLOCK_IMAGE(page)
+
+    if image:
+        image = _ensure_https(image)
+        image = _clean_amazon_img(image)
+    return image
+
+
+# start of the markup hashed to detect an unchanged price (see conditional.py)
+PRICE_MARKERS = ('id="corePrice_feature_div"', 'id="priceblock_dealprice"', 'id="priceblock_ourprice"',
+                 'id="acrCustomerReviewText"')
+# once all of these have streamed in, the rest of the page is not downloaded (see stream.py)
+STOP_MARKERS = (b'id="productTitle"', b'a-offscreen', b'data-a-dynamic-image', b'id="acrCustomerReviewText"')
+WALLS = (b"captcha", b"robot check")
+
+
+def parse_amazon_html(text: str, url: str = "") -> dict | None:
+    """Extract product details from an Amazon product page."""
+    page = Page(text, url)
+    fields = FIELDS(page)
+
+    title = fields["title"]
+    if not title:
+        print("Amazon: title not found")
+        return None
+
+    return {
+        "title": title[:200],
+        "price": fields["price"],
+        "image": _extract_image(page),     # direct URL (may 403 when embedded)
+        "rating": fields["rating"],
+        "rating_count": fields["rating_count"],
+    }
+
+
+def _headers(url: str) -> dict:
+    return {
         "User-Agent": UA,
         "Accept-Language": "en-IN,en;q=0.9",
         "Pragma": "no-cache",
@@ -83,136 +203,45 @@ def get_amazon_product_details(url: str) -> dict | None:
         "DNT": "1",
     }
 
-    try:
-        time.sleep(2)  # be nice
-        s = requests.Session()
-        r = s.get(url, headers=headers, timeout=20, allow_redirects=True)
-        r.raise_for_status()
-
-        # Detect robot check/captcha page
-        low = r.text.lower()
-        if ("captcha" in low) or ("robot check" in low) or ("/errors/validatecaptcha" in r.url.lower()):
-            print("Amazon: Blocked by captcha/Robot Check")
-            return None
 
-        soup = BeautifulSoup(r.text, "lxml")  # lxml is more robust than html.parser
-
-        # Title (with og:title fallback)
-        title = None
-        for sel in ['#productTitle', 'h1#title', '.product-title', 'h1.a-size-large', '[data-automation-id="product-title"]',
-                    'meta[property="og:title"]']:
-            el = soup.select_one(sel)
-            if el:
-                title = el.get("content").strip() if el.name == "meta" else el.get_text(strip=True)
-                if title:
-                    break
-        if not title:
-            print("Amazon: title not found")
-            return None
+def _result(url: str, d) -> dict | None:
+    r = d.response
+    if r.status_code == 304:
+        return UNCHANGED
+    r.raise_for_status()
 
-        # Price
-        price = None
-        for sel in [
-            '.a-price .a-offscreen',
-            '#priceblock_dealprice', '#priceblock_ourprice', '#corePrice_feature_div .a-offscreen',
-            '.a-price .a-price-range .a-price-whole', '.a-price-current .a-offscreen',
-            'meta[property="og:price:amount"]'
-        ]:
-            el = soup.select_one(sel)
-            if el:
-                txt = el.get("content") if el.name == "meta" else el.get_text()
-                txt = (txt or "").strip()
-                txt = re.sub(r"[^\d.,]", "", txt.replace("₹", "").replace("$", ""))
-                txt = txt.replace(",", "")
-                try:
-                    price = float(txt)
-                    break
-                except Exception:
-                    pass
-
-        # Image (robust)
-        image = None
-
-        # 1) data-a-dynamic-image on landingImage (best)
-        landing = soup.select_one("#landingImage, #imgTagWrapperId img, .a-dynamic-image")
-        if landing:
-            dyn = landing.get("data-a-dynamic-image")
-            if dyn:
-                image = _pick_largest_from_dynamic_json(dyn)
+    # Detect robot check/captcha page (checked on the first chunks while streaming)
+    if d.wall or ("/errors/validatecaptcha" in r.url.lower()):
+        print("Amazon: Blocked by captcha/Robot Check")
+        return None
 
-        # 2) srcset on main image
-        if not image and landing and landing.get("srcset"):
-            image = _pick_from_srcset(landing.get("srcset"))
+    return parse_if_changed(url, r, d.text, PRICE_MARKERS, parse_amazon_html)
 
-        # 3) direct attributes
-        if not image and landing:
-            image = landing.get("data-old-hires") or landing.get("data-src") or landing.get("src")
 
-        # 4) og:image meta fallback
-        if not image:
-            og = soup.select_one('meta[property="og:image"]')
-            if og and og.get("content"):
-                image = og.get("content").strip()
+def get_amazon_product_details(url: str) -> dict | None:
+    try:
+        throttle(url)  # be nice
+        s = get_session(url)
+        d = download(s, url, headers=request_headers(url, _headers(url)), timeout=20, allow_redirects=True,
+                     walls=WALLS, stop_markers=STOP_MARKERS)
+        return _result(url, d)
+    except requests.RequestException as e:
+        print(f"Amazon request error: {e}")
+        return None
+    except Exception as e:
+        print(f"Amazon scraping error: {e}")
+        return None
 
-        # 5) last resort: any img in block containers
-        if not image:
-            for sel in ['#imageBlock_feature_div img', '#ebooksImageBlockContainer img', '#imageBlock img']:
-                el = soup.select_one(sel)
-                if el:
-                    image = el.get("data-old-hires") or el.get("data-src") or el.get("src")
-                    if image:
-                        break
-
-        if image:
-            image = _ensure_https(image)
-            image = _clean_amazon_img(image)
-            # basic sanity: only allow amazon media hosts
-            host = urlparse(image).netloc
-            if not host.endswith("amazon.com") and "m.media-amazon.com" not in host and "ssl-images-amazon.com" not in host:
-                # still allow m.media-amazon.com, images-na.ssl-images-amazon.com
-                pass
-
-        # Rating
-        rating = None
-        for sel in [
-            'i[data-hook="average-star-rating"] .a-icon-alt',
-            '.a-icon-star .a-icon-alt',
-            '#acrPopover .a-icon-alt',
-            '.cr-widget-AverageCustomerReviews .a-icon-alt'
-        ]:
-            el = soup.select_one(sel)
-            if el:
-                m = re.search(r"(\d+(\.\d+)?)", el.get_text())
-                if m:
-                    try:
-                        rating = float(m.group(1))
-                        break
-                    except Exception:
-                        pass
-
-        # Rating count
-        rating_count = None
-        for sel in ['#acrCustomerReviewText', '[data-hook="total-review-count"]', '.a-link-normal .a-size-base']:
-            el = soup.select_one(sel)
-            if el:
-                m = re.search(r"([\d,]+)", el.get_text())
-                if m:
-                    try:
-                        rating_count = int(m.group(1).replace(",", ""))
-                        break
-                    except Exception:
-                        pass
-
-        return {
-            "title": title[:200],
-            "price": price,
-            "image": image,     # direct URL (may 403 when embedded)
-            "rating": rating,
-            "rating_count": rating_count,
-        }
+
+async def get_amazon_product_details_async(url: str) -> dict | None:
+    try:
+        await aio.throttle(url)  # be nice
+        d = await aio.download(url, headers=request_headers(url, _headers(url)), timeout=20,
+                               walls=WALLS, stop_markers=STOP_MARKERS)
+        return _result(url, d)
     except requests.RequestException as e:
         print(f"Amazon request error: {e}")
         return None
     except Exception as e:
         print(f"Amazon scraping error: {e}")
-        return None
\ No newline at end of file
+        return None
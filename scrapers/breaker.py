@@ -0,0 +1,166 @@
+# scrapers/breaker.py
+"""
+Per-host circuit breaker for bot walls and rate limiting.
+
+Every download reports its outcome here: a captcha / JS wall, a 403 or a
+429 counts as "blocked", a normal page (or 304) as "ok"; anything else
+(404, 5xx, network errors) is neutral. When at least BREAKER_MIN_BLOCKED
+of a host's last BREAKER_WINDOW outcomes were blocked and they make up
+BREAKER_RATE of them, the host's circuit opens: downloads to it raise
+CircuitOpen without touching the network, and scrape() reports the
+product as deferred so the refresh reschedules it instead of counting a
+failure.
+
+After the cooldown (BREAKER_COOLDOWN seconds, or a longer Retry-After)
+the circuit goes half-open and lets exactly one probe request through.
+A clean page closes it; another block reopens it with the cooldown
+doubled, up to BREAKER_MAX_COOLDOWN. states() exposes all of it.
+"""
+from __future__ import annotations
+import os, threading, time
+from collections import deque
+from urllib.parse import urlparse
+
+import requests
+
+WINDOW = int(os.environ.get("BREAKER_WINDOW", 20))
+MIN_BLOCKED = int(os.environ.get("BREAKER_MIN_BLOCKED", 5))
+RATE = float(os.environ.get("BREAKER_RATE", 0.5))
+COOLDOWN = float(os.environ.get("BREAKER_COOLDOWN", 300))
+MAX_COOLDOWN = float(os.environ.get("BREAKER_MAX_COOLDOWN", 3600))
+PROBE_TIMEOUT = 120  # a probe that never reports back frees its slot after this long
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+OK, BLOCKED, NEUTRAL = "ok", "blocked", "neutral"
+BLOCKED_STATUSES = (403, 429)
+
+
+class CircuitOpen(requests.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class Circuit:
+    def __init__(self):
+        self.state = CLOSED
+        self.outcomes: deque[bool] = deque(maxlen=WINDOW)  # True = blocked
+        self.cooldown = COOLDOWN
+        self.open_until = 0.0
+        self.probe_started = None  # monotonic time of the in-flight half-open probe
+        self.opened = 0
+
+    def _refresh(self, now: float) -> None:
+        if self.state == OPEN and now >= self.open_until:
+            self.state = HALF_OPEN
+        if self.probe_started is not None and now - self.probe_started > PROBE_TIMEOUT:
+            self.probe_started = None
+
+    def blocked_for(self, now: float) -> float:
+        self._refresh(now)
+        if self.state == OPEN:
+            return self.open_until - now
+        if self.state == HALF_OPEN and self.probe_started is not None:
+            return PROBE_TIMEOUT - (now - self.probe_started)
+        return 0.0
+
+    def acquire(self, now: float) -> bool:
+        if self.blocked_for(now) > 0:
+            return False
+        if self.state == HALF_OPEN:
+            self.probe_started = now
+        return True
+
+    def record(self, outcome: str, now: float, retry_after: float | None) -> str | None:
+        """Fold one outcome in; returns the new state if it changed."""
+        was = self.state
+        if self.state == HALF_OPEN:
+            self.probe_started = None
+            if outcome == OK:
+                self.state = CLOSED
+                self.outcomes.clear()
+                self.cooldown = COOLDOWN
+            elif outcome == BLOCKED:
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+                self._open(now, retry_after)
+        elif outcome != NEUTRAL:
+            self.outcomes.append(outcome == BLOCKED)
+            blocked = sum(self.outcomes)
+            if self.state == CLOSED and blocked >= MIN_BLOCKED and blocked >= RATE * len(self.outcomes):
+                self._open(now, retry_after)
+        return self.state if self.state != was else None
+
+    def _open(self, now: float, retry_after: float | None) -> None:
+        self.state = OPEN
+        self.open_until = now + max(self.cooldown, retry_after or 0.0)
+        self.opened += 1
+
+
+_circuits: dict[str, Circuit] = {}
+_lock = threading.Lock()
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _circuit(host: str) -> Circuit:
+    c = _circuits.get(host)
+    if c is None:
+        c = _circuits.setdefault(host, Circuit())
+    return c
+
+
+def blocked_for(url: str) -> float:
+    """Seconds until url's host accepts a request again (0 = now)."""
+    with _lock:
+        return max(0.0, _circuit(_host(url)).blocked_for(time.monotonic()))
+
+
+def acquire(url: str) -> None:
+    """Let one request to url's host through, or raise CircuitOpen."""
+    host = _host(url)
+    with _lock:
+        c = _circuit(host)
+        if c.acquire(time.monotonic()):
+            return
+        wait = c.blocked_for(time.monotonic())
+    raise CircuitOpen(f"circuit open for {host}, retry in {wait:.0f}s")
+
+
+def _retry_after(response) -> float | None:
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None  # absent, or an HTTP date: the cooldown applies
+
+
+def report(url: str, response=None, wall: str | None = None) -> None:
+    """Classify one download (response None = it failed before any response) and update url's host."""
+    if wall or (response is not None and response.status_code in BLOCKED_STATUSES):
+        outcome = BLOCKED
+    elif response is not None and (200 <= response.status_code < 300 or response.status_code == 304):
+        outcome = OK
+    else:
+        outcome = NEUTRAL
+    host = _host(url)
+    retry_after = _retry_after(response) if response is not None else None
+    with _lock:
+        changed = _circuit(host).record(outcome, time.monotonic(), retry_after)
+    if changed:
+        print(f"Circuit for {host} is now {changed}")
+
+
+def states() -> dict[str, dict]:
+    now = time.monotonic()
+    with _lock:
+        out = {}
+        for host, c in _circuits.items():
+            wait = c.blocked_for(now)
+            out[host] = {
+                "state": c.state,
+                "blocked": sum(c.outcomes),
+                "window": len(c.outcomes),
+                "retry_in": round(max(0.0, wait), 1),
+                "cooldown": c.cooldown,
+                "times_opened": c.opened,
+            }
+        return out
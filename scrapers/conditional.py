@@ -0,0 +1,130 @@
+# scrapers/conditional.py
+"""
+Conditional fetches for the periodic price refresh.
+
+For every product URL we remember the upstream validators (ETag /
+Last-Modified) and a digest of the page's price region (JSON-LD blocks,
+price meta tags and a window after each platform's price markers). Inside
+scrape(url, conditional=True) the scrapers send If-None-Match /
+If-Modified-Since and return UNCHANGED on a 304, or when the downloaded
+page's price region hashes the same as last time - skipping the full parse
+and, in the app, the DB writes.
+
+Fingerprints are only remembered by conditional scrapes (whose results the
+refresh applies to every subscriber) and only after a parse that produced
+a price, so a blocked or broken page never masks a later real change. The
+store is in-process; the app persists it on Listing and seeds it back with
+seed().
+
+parse_if_changed() is also where the parse is handed to the process pool
+in pipeline mode (see pipeline.py).
+"""
+from __future__ import annotations
+import contextlib, contextvars, functools, hashlib, re, threading
+from dataclasses import dataclass
+
+from . import pipeline as _pipeline
+
+WINDOW = 1024  # bytes of markup hashed after each price marker
+
+_LDJSON = re.compile(rb'<script[^>]*application/ld\+json[^>]*>(.*?)</script>', re.S | re.I)
+_META_PRICE = re.compile(rb'<meta[^>]+(?:price:amount|itemprop="price")[^>]*>', re.I)
+
+
+class _Unchanged:
+    def __repr__(self):
+        return "UNCHANGED"
+
+    def __bool__(self):
+        return True
+
+
+UNCHANGED = _Unchanged()
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    etag: str | None = None
+    last_modified: str | None = None
+    digest: str | None = None
+
+
+_enabled = contextvars.ContextVar("conditional_fetch", default=False)
+_known: dict[str, Fingerprint] = {}
+_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def active():
+    """Send validators and allow UNCHANGED results for scrapes inside this block."""
+    token = _enabled.set(True)
+    try:
+        yield
+    finally:
+        _enabled.reset(token)
+
+
+def seed(url: str, etag: str | None, last_modified: str | None, digest: str | None) -> None:
+    """Load a persisted fingerprint unless this process already has a newer one."""
+    with _lock:
+        _known.setdefault(url, Fingerprint(etag, last_modified, digest))
+
+
+def known(url: str) -> Fingerprint:
+    with _lock:
+        return _known.get(url) or Fingerprint()
+
+
+def request_headers(url: str, headers: dict) -> dict:
+    """headers plus If-None-Match / If-Modified-Since when conditional fetching is on."""
+    if not _enabled.get():
+        return headers
+    fp = known(url)
+    extra = {}
+    if fp.etag:
+        extra["If-None-Match"] = fp.etag
+    if fp.last_modified:
+        extra["If-Modified-Since"] = fp.last_modified
+    return {**headers, **extra} if extra else headers
+
+
+def region_digest(body: str | bytes, markers: tuple[str, ...]) -> str | None:
+    """sha1 over the price-bearing parts of a page; None if none were found."""
+    raw = body.encode("utf-8", "replace") if isinstance(body, str) else body
+    parts = _LDJSON.findall(raw) + _META_PRICE.findall(raw)
+    for marker in markers:
+        i = raw.find(marker.encode())
+        if i >= 0:
+            parts.append(raw[i:i + WINDOW])
+    if not parts:
+        return None
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(p)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def parse_if_changed(url: str, response, body: str | bytes, markers: tuple[str, ...], parse):
+    """parse(body, url), unless the price region matches the last successful parse.
+
+    In pipeline mode a ParseJob is returned instead, for the registry to run.
+    """
+    fp = None
+    if _enabled.get():
+        fp = Fingerprint(response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                         region_digest(body, markers))
+        if fp.digest and known(url).digest == fp.digest:
+            with _lock:
+                _known[url] = fp  # validators may have rotated even though the content did not
+            return UNCHANGED
+    if _pipeline.deferring():
+        return _pipeline.ParseJob(url, parse, body, functools.partial(_remember, url, fp))
+    return _remember(url, fp, parse(body, url))
+
+
+def _remember(url: str, fp: Fingerprint | None, info: dict | None) -> dict | None:
+    if fp is not None and info and info.get("price") is not None:
+        with _lock:
+            _known[url] = fp
+    return info
@@ -1,14 +1,20 @@
-from bs4 import BeautifulSoup
-import time
 import re
 import json
+import time
+from bisect import bisect_left
+from collections import deque
 from urllib.parse import urljoin
+from lxml import etree
+from .extract import Page, Field, rule
+from .session import get_session
+from .ratelimit import throttle
+from .conditional import UNCHANGED, request_headers, parse_if_changed
+from .stream import download
 
 try:
-    import cloudscraper
+    import cloudscraper  # noqa: F401  (availability check; sessions come from .session)
     _HAS_CLOUDSCRAPER = True
 except Exception:
-    import requests
     _HAS_CLOUDSCRAPER = False
 
 def _abs_url(base, u):
@@ -74,109 +80,366 @@ def _json_loads_loose(text):
                 return None
     return None
 
-def _bfs_find_first_numeric(obj, keys_priority):
-    # Breadth-first search through nested dict/list to find first numeric under any key in keys_priority
-    if obj is None:
-        return None
-    q = [obj]
-    seen = 0
-    while q and seen < 150000:
-        seen += 1
-        cur = q.pop(0)
-        if isinstance(cur, dict):
-            # direct matches
-            for k in keys_priority:
-                if k in cur:
-                    p = _to_float(cur[k])
-                    if p:
-                        return p
-            for v in cur.values():
-                if isinstance(v, (dict, list)):
-                    q.append(v)
-        elif isinstance(cur, list):
-            for v in cur:
-                if isinstance(v, (dict, list)):
-                    q.append(v)
+# Hard per-page budget for digging through embedded JSON; whichever runs out first stops the scan
+JSON_SCAN_MAX_BYTES = 2_000_000   # script text scanned + candidate objects decoded
+JSON_MAX_NODES = 60_000           # dict/list nodes visited by the walk
+JSON_SCAN_SECONDS = 0.25
+
+PRICE_KEYS = ('finalPrice', 'youPay', 'offerPrice', 'sellingPrice', 'currentPrice', 'price', 'displayPrice', 'totalPayable', 'amount')
+IMAGE_KEYS = ('image', 'imageUrl', 'thumbnail', 'primaryImage', 'url')
+RATING_KEYS = ('ratingValue', 'averageRating', 'avgRating')
+RATING_COUNT_KEYS = ('reviewCount', 'ratingCount', 'ratingsCount', 'totalRatings')
+
+_IMG_EXT = re.compile(r'\.(?:jpg|jpeg|png|webp)(?:\?|$)', re.I)
+_PRICE_HINT = re.compile(r'finalPrice|youPay|offerPrice|sellingPrice|currentPrice|price')
+# a complete double-quoted string (skipped whole, in C) or a brace; anything else is ignored
+_JS_TOKEN = re.compile(r'"(?:[^"\\\n]|\\.)*"|[{}]')
+
+_JSON_SCRIPTS = etree.XPath('//script[@type="application/json" or @type="application/ld+json" or @id="__NEXT_DATA__"]')
+_INLINE_SCRIPTS = etree.XPath('//script[not(@src) and not(@type="application/json") and not(@type="application/ld+json") and not(@id="__NEXT_DATA__")]')
+
+
+class _Budget:
+    def __init__(self):
+        self.bytes = JSON_SCAN_MAX_BYTES
+        self.nodes = JSON_MAX_NODES
+        self.deadline = time.monotonic() + JSON_SCAN_SECONDS
+
+    def spend(self, n):
+        """Charge n bytes; False once the byte or time budget is gone."""
+        self.bytes -= n
+        return self.bytes >= 0 and time.monotonic() < self.deadline
+
+
+def _object_spans(text, budget):
+    """(start, end) of brace-balanced {...} objects in JS text that mention a price key.
+
+    Braces inside double-quoted strings are skipped, so one linear pass
+    finds the objects the old lazy `{[\\s\\S]*?price[\\s\\S]*?}` regex had to
+    backtrack for. Spans are yielded per top-level object, outermost first.
+    """
+    hints = [m.start() for m in _PRICE_HINT.finditer(text)]
+    if not hints:
+        return
+    group, stack = [], []
+    for i, m in enumerate(_JS_TOKEN.finditer(text)):
+        if not i & 0x3FF and time.monotonic() >= budget.deadline:
+            return
+        tok = m.group()
+        if tok == '{':
+            stack.append(m.start())
+        elif tok == '}' and stack:
+            start, end = stack.pop(), m.end()
+            j = bisect_left(hints, start)
+            if j < len(hints) and hints[j] < end:
+                group.append((start, end))
+            if not stack and group:
+                group.sort(key=lambda s: (s[0], -s[1]))
+                yield from group
+                group = []
+
+
+def _inline_objects(text, budget):
+    covered = -1
+    for start, end in _object_spans(text, budget):
+        if end <= covered:
+            continue  # nested inside an object that already decoded
+        if not budget.spend(end - start):
+            return
+        try:
+            data = json.loads(text[start:end])
+        except ValueError:
+            continue  # JS literal, not JSON; its inner objects may still decode
+        covered = end
+        yield data
+
+
+def _json_blobs(page, budget):
+    """Decoded JSON scripts, then JSON objects embedded in inline JS (__APOLLO_STATE__, dataLayer, ...)."""
+    for sc in _JSON_SCRIPTS(page.root):
+        text = (sc.text or "").strip()
+        if not text or not budget.spend(len(text)):
+            continue
+        data = _json_loads_loose(text)
+        if data is not None:
+            yield data
+
+    for sc in _INLINE_SCRIPTS(page.root):
+        text = sc.text or ""
+        if '{' not in text:
+            continue
+        if len(text) > budget.bytes:
+            text = text[:max(budget.bytes, 0)]
+        if not budget.spend(len(text)):
+            return
+        yield from _inline_objects(text, budget)
+
+
+def _image_in(v):
+    if isinstance(v, str) and _IMG_EXT.search(v):
+        return v
+    if isinstance(v, list):
+        for item in v:
+            if isinstance(item, str) and _IMG_EXT.search(item):
+                return item
+            if isinstance(item, dict):
+                u = item.get('url') or item.get('image') or item.get('imageUrl')
+                if isinstance(u, str) and _IMG_EXT.search(u):
+                    return u
     return None
 
-def _bfs_find_first_image(obj):
-    # Look for a usable image URL anywhere in nested JSON
-    if obj is None:
-        return None
-    q = [obj]
-    seen = 0
-    while q and seen < 150000:
-        seen += 1
-        cur = q.pop(0)
-        if isinstance(cur, dict):
-            # Try common image keys first
-            for k in ('image', 'imageUrl', 'thumbnail', 'primaryImage', 'url'):
-                v = cur.get(k)
-                if isinstance(v, str) and re.search(r'\.(?:jpg|jpeg|png|webp)(?:\?|$)', v, re.I):
-                    return v
-                if isinstance(v, list):
-                    for item in v:
-                        if isinstance(item, str) and re.search(r'\.(?:jpg|jpeg|png|webp)(?:\?|$)', item, re.I):
-                            return item
-                        if isinstance(item, dict):
-                            u = item.get('url') or item.get('image') or item.get('imageUrl')
-                            if isinstance(u, str) and re.search(r'\.(?:jpg|jpeg|png|webp)(?:\?|$)', u, re.I):
-                                return u
-            for v in cur.values():
-                if isinstance(v, (dict, list)):
-                    q.append(v)
-        elif isinstance(cur, list):
-            for v in cur:
-                if isinstance(v, (dict, list)):
-                    q.append(v)
+
+def _first_of(d, keys, parse):
+    for k in keys:
+        if k in d:
+            v = parse(d[k])
+            if v:
+                return v
     return None
 
-def _extract_any_json_blobs(html, soup):
-    blobs = []
 
-    # 1) Explicit JSON scripts
-    for sc in soup.find_all('script', {'type': ['application/json', 'application/ld+json']}):
-        text = sc.string or sc.get_text(strip=True)
-        if not text:
+def _scan_json(page):
+    """One bounded breadth-first walk over the page's JSON blobs collecting price, image and rating.
+
+    Blobs are walked in page order, each breadth-first, so the first hit per
+    field matches what separate per-field searches would have returned.
+    """
+    budget = _Budget()
+    found = dict.fromkeys(('price', 'image', 'rating', 'rating_count'))
+    for blob in _json_blobs(page, budget):
+        q = deque((blob,))
+        while q:
+            budget.nodes -= 1
+            if budget.nodes < 0 or (not budget.nodes & 0x3FF and time.monotonic() >= budget.deadline):
+                return found
+            cur = q.popleft()
+            if isinstance(cur, dict):
+                if found['price'] is None:
+                    found['price'] = _first_of(cur, PRICE_KEYS, _to_float)
+                if found['image'] is None:
+                    for k in IMAGE_KEYS:
+                        found['image'] = _image_in(cur.get(k))
+                        if found['image']:
+                            break
+                if found['rating'] is None:
+                    r = _first_of(cur, RATING_KEYS, _to_float)
+                    found['rating'] = r if r and r <= 5 else None
+                if found['rating_count'] is None:
+                    rc = _first_of(cur, RATING_COUNT_KEYS, _to_float)
+                    found['rating_count'] = int(rc) if rc else None
+                children = cur.values()
+            elif isinstance(cur, list):
+                children = cur
+            else:
+                continue
+            if found['price'] is not None and found['image'] is not None:
+                return found
+            q.extend(v for v in children if isinstance(v, (dict, list)))
+    return found
+
+def _pick_product(obj):
+    return obj if isinstance(obj, dict) and obj.get('@type') == 'Product' else None
+
+
+def _jsonld_product(page):
+    for data in page.jsonld():
+        if not data:
             continue
-        data = _json_loads_loose(text)
-        if data is not None:
-            blobs.append(data)
+        pd = None
+        if isinstance(data, dict):
+            pd = _pick_product(data)
+            if not pd and isinstance(data.get('@graph'), list):
+                for it in data['@graph']:
+                    pd = _pick_product(it)
+                    if pd:
+                        break
+        elif isinstance(data, list):
+            for it in data:
+                pd = _pick_product(it)
+                if pd:
+                    break
+        if pd:
+            return pd
+    return None
 
-    # 2) __NEXT_DATA__
-    sc = soup.find('script', id='__NEXT_DATA__') or soup.select_one('script#__NEXT_DATA__')
-    if sc and (sc.string or sc.get_text()):
-        data = _json_loads_loose(sc.string or sc.get_text())
-        if data is not None:
-            blobs.append(data)
 
-    # 3) __APOLLO_STATE__ or dataLayer in inline JS
-    #   a) Apollo
-    m = re.search(r'__APOLLO_STATE__\s*=\s*(\{.*?\})\s*;\s*</script>', html, re.S)
-    if m:
-        try:
-            blobs.append(json.loads(m.group(1)))
-        except Exception:
-            pass
-    #   b) dataLayer
-    for m in re.finditer(r'dataLayer\s*=\s*(```math[\s\S]*?```)\s*;', html):
-        try:
-            blobs.append(json.loads(m.group(1)))
-        except Exception:
-            pass
-    for m in re.finditer(r'dataLayer\.pushKATEX_INLINE_OPEN\s*(\{[\s\S]*?\})\s*KATEX_INLINE_CLOSE\s*;', html):
-        try:
-            blobs.append(json.loads(m.group(1)))
-        except Exception:
-            pass
+def _count(val):
+    m = re.search(r'([\d,]+)', val)
+    try:
+        return int(m.group(1).replace(',', '')) if m else None
+    except ValueError:
+        return None
+
 
-    # 4) Generic inline JSON that obviously contains price keys
-    for m in re.finditer(r'(\{[\s\S]*?(?:finalPrice|youPay|offerPrice|sellingPrice|currentPrice|price)[\s\S]*?\})', html):
-        data = _json_loads_loose(m.group(1))
-        if data:
-            blobs.append(data)
+# Selectors are compiled once at import; order is fallback priority
+META_TITLE = Field(rule('meta[property="og:title"]'), rule('meta[name="twitter:title"]'))
+DOM_TITLE = Field(*(rule(sel) for sel in (
+    'h1.pdp-product-name', 'h1.pdp-title', '.product-title h1',
+    'h1[data-testid="productName"]', 'h1.product-name', 'h1'
+)))
+META_PRICE = Field(
+    rule('meta[itemprop="price"]'),
+    rule('meta[property="product:price:amount"]'),
+    rule('meta[property="og:price:amount"]'),
+    rule('meta[name="twitter:data1"]'),
+    parse=_to_float,
+)
+DOM_PRICE = Field(*(rule(sel, sep=" ") for sel in (
+    '.pdp-price .amount',
+    '.product-price .final-price',
+    '.product-price .amount',
+    '.price-final',
+    '.new-price',
+    '.selling-price',
+    '.current-price',
+    '.cp-price__current',
+    '.pdp__price',
+    '.pdp-price'
+)), parse=_to_float)
+META_IMAGE = Field(
+    rule('meta[property="og:image"]'),
+    rule('meta[name="twitter:image"]'),
+    rule('link[rel="image_src"]', 'content', 'href'),
+)
+IMG_RULES = tuple(rule(sel) for sel in (
+    'img[itemprop="image"]',
+    '.pdp-image img',
+    '.product-image img',
+    '.main-image img',
+    '.gallery-image img',
+    '.product-gallery img',
+    '.pdp__image img',
+    '.swiper-slide img',
+    'picture source'  # for <picture><source srcset=...>
+))
+RATING = Field(*(rule(sel) for sel in (
+    '.rating-value', '.star-rating .rating', '[itemprop="ratingValue"]', '.reviews-rating'
+)), parse=_to_float)
+RATING_COUNT = Field(*(rule(sel) for sel in (
+    '.rating-count', '.reviews-count', '.total-reviews', '[itemprop="reviewCount"]'
+)), parse=_count)
+
+
+# start of the markup hashed to detect an unchanged price (see conditional.py)
+PRICE_MARKERS = ('"sellingPrice"', '"finalPrice"', 'class="amount', 'class="pdp-price', 'class="new-price')
+# once all of these have streamed in (a pair: its closer after its opener), the rest of
+# the page is not downloaded (see stream.py)
+STOP_MARKERS = ((b'application/ld+json', b'</script>'), (b'__NEXT_DATA__', b'</script>'))
+WALLS = (b"captcha", b"access denied", b"just a moment", b"enable javascript")
+
+
+def parse_croma_html(html, url=""):
+    """Extract product details from a Croma product page."""
+    page = Page(html, url)
+
+    # 1) Product JSON-LD (title, price, image, rating)
+    product_data = _jsonld_product(page)
+
+    # Title
+    title = None
+    if product_data and product_data.get('name'):
+        title = product_data['name']
+    if not title:
+        title = META_TITLE(page)
+    if not title:
+        title = DOM_TITLE(page)
+    if not title:
+        print("Croma: Title not found (possible bot wall).")
+        return None
+
+    # Price
+    price = None
+    if product_data and product_data.get('offers'):
+        price = _price_from_offers(product_data['offers'])
+
+    if not price:
+        # Meta fallbacks
+        price = META_PRICE(page)
+
+    # Embedded JSON (__NEXT_DATA__, __APOLLO_STATE__, dataLayer, ...), walked once for every field
+    found = None
+    if not price:
+        found = _scan_json(page)
+        price = found['price']
+
+    # DOM fallbacks (last resort)
+    if not price:
+        price = DOM_PRICE(page)
+
+    # Regex last chance
+    if not price:
+        m = re.search(
+            r'"(finalPrice|youPay|offerPrice|sellingPrice|currentPrice|price|displayPrice|totalPayable|amount)"\s*:\s*"?([\d,\.]+)"?',
+            page.html, re.I
+        )
+        if m:
+            price = _to_float(m.group(2))
+
+    # Image
+    image = None
+    if product_data and product_data.get('image'):
+        img = product_data['image']
+        if isinstance(img, list):
+            image = img[0] if img else None
+        else:
+            image = img
+        image = _abs_url(url, image)
+
+    if not image:
+        image = _abs_url(url, META_IMAGE(page))
+
+    if not image:
+        for r in IMG_RULES:
+            el = page.first(r)
+            if el is None:
+                continue
+            src = el.get('src') or el.get('data-src') or el.get('data-original') or el.get('data-lazy')
+            if not src:
+                srcset = el.get('srcset') or el.get('data-srcset')
+                if srcset:
+                    # take highest-res from srcset
+                    parts = [p.strip().split(' ') for p in srcset.split(',')]
+                    if parts:
+                        src = parts[-1][0]
+            if src:
+                image = _abs_url(url, src)
+                if image:
+                    break
+
+    # If still no image, try from JSON blobs
+    if not image:
+        if found is None:
+            found = _scan_json(page)
+        if found['image']:
+            image = _abs_url(url, found['image'])
+
+    # Rating and count
+    rating = None
+    rating_count = None
+    if product_data and product_data.get('aggregateRating'):
+        agg = product_data['aggregateRating']
+        rating = _to_float(agg.get('ratingValue'))
+        rc = _to_float(agg.get('reviewCount') or agg.get('ratingCount'))
+        rating_count = int(rc) if rc is not None else None
+
+    if rating is None:
+        rating = RATING(page)
+    if rating_count is None:
+        rating_count = RATING_COUNT(page)
+    if found is not None:  # only if the JSON walk already ran for price/image
+        if rating is None:
+            rating = found['rating']
+        if rating_count is None:
+            rating_count = found['rating_count']
+
+    return {
+        'title': title[:200],
+        'price': price,
+        'image': image,
+        'rating': rating,
+        'rating_count': rating_count
+    }
 
-    return blobs
 
 def get_croma_product_details(url):
     headers = {
@@ -190,248 +453,28 @@ def get_croma_product_details(url):
     }
 
     try:
-        # Choose session
-        if _HAS_CLOUDSCRAPER:
-            session = cloudscraper.create_scraper(
-                browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
-            )
-            # cloudscraper handles brotli automatically
-            session.headers.update(headers)
-        else:
-            import requests
-            session = requests.Session()
-            session.headers.update(headers)
-
-        time.sleep(1.0)
-        resp = session.get(url, timeout=25)
+        # Choose session (cloudscraper handles brotli automatically)
+        session = get_session(
+            url, cloudscraper=_HAS_CLOUDSCRAPER,
+            browser={'browser': 'chrome', 'platform': 'windows', 'mobile': False}
+        )
+
+        throttle(url)
+        d = download(session, url, headers=request_headers(url, headers), timeout=25,
+                     walls=WALLS, stop_markers=STOP_MARKERS)
+        resp = d.response
+        if resp.status_code == 304:
+            return UNCHANGED
         if resp.status_code >= 400:
             print(f"Croma: HTTP {resp.status_code}")
             return None
 
-        html = resp.text
-        lower = html.lower()
-        if any(x in lower for x in ["captcha", "access denied", "just a moment", "enable javascript"]):
+        if d.wall:
             print("Croma: anti-bot or JS wall encountered. Install/use cloudscraper or proxy.")
             return None
 
-        soup = BeautifulSoup(html, "lxml")
-
-        # 1) Product JSON-LD (title, price, image, rating)
-        product_data = None
-        for sc in soup.find_all('script', type='application/ld+json'):
-            text = sc.string or sc.get_text(strip=True)
-            if not text:
-                continue
-            data = _json_loads_loose(text)
-            if not data:
-                continue
-
-            def pick_product(obj):
-                return obj if isinstance(obj, dict) and obj.get('@type') == 'Product' else None
-
-            pd = None
-            if isinstance(data, dict):
-                pd = pick_product(data)
-                if not pd and isinstance(data.get('@graph'), list):
-                    for it in data['@graph']:
-                        pd = pick_product(it)
-                        if pd:
-                            break
-            elif isinstance(data, list):
-                for it in data:
-                    pd = pick_product(it)
-                    if pd:
-                        break
-            if pd:
-                product_data = pd
-                break
-
-        # Title
-        title = None
-        if product_data and product_data.get('name'):
-            title = product_data['name']
-
-        if not title:
-            for sel in ['meta[property="og:title"]', 'meta[name="twitter:title"]']:
-                mt = soup.select_one(sel)
-                if mt and mt.get('content'):
-                    title = mt['content'].strip()
-                    break
-
-        if not title:
-            for sel in [
-                'h1.pdp-product-name', 'h1.pdp-title', '.product-title h1',
-                'h1[data-testid="productName"]', 'h1.product-name', 'h1'
-            ]:
-                el = soup.select_one(sel)
-                if el and el.get_text(strip=True):
-                    title = el.get_text(strip=True)
-                    break
-
-        if not title:
-            print("Croma: Title not found (possible bot wall).")
-            return None
-
-        # Price
-        price = None
-        if product_data and product_data.get('offers'):
-            price = _price_from_offers(product_data['offers'])
-
-        if not price:
-            # Meta fallbacks
-            for sel in [
-                'meta[itemprop="price"]',
-                'meta[property="product:price:amount"]',
-                'meta[property="og:price:amount"]',
-                'meta[name="twitter:data1"]'
-            ]:
-                mt = soup.select_one(sel)
-                if mt and mt.get('content'):
-                    p = _to_float(mt['content'])
-                    if p:
-                        price = p
-                        break
-
-        # Parse all JSON blobs (__NEXT_DATA__, dataLayer, etc.)
-        if not price:
-            blobs = _extract_any_json_blobs(html, soup)
-            if blobs:
-                priority = ['finalPrice', 'youPay', 'offerPrice', 'sellingPrice', 'currentPrice', 'price', 'displayPrice', 'totalPayable', 'amount']
-                for b in blobs:
-                    p = _bfs_find_first_numeric(b, priority)
-                    if p:
-                        price = p
-                        break
-
-        # DOM fallbacks (last resort)
-        if not price:
-            price_selectors = [
-                '.pdp-price .amount',
-                '.product-price .final-price',
-                '.product-price .amount',
-                '.price-final',
-                '.new-price',
-                '.selling-price',
-                '.current-price',
-                '.cp-price__current',
-                '.pdp__price',
-                '.pdp-price'
-            ]
-            for sel in price_selectors:
-                el = soup.select_one(sel)
-                if not el:
-                    continue
-                txt = el.get('content') if el.name == 'meta' else el.get_text(" ", strip=True)
-                p = _to_float(txt)
-                if p:
-                    price = p
-                    break
-
-        # Regex last chance
-        if not price:
-            m = re.search(
-                r'"(finalPrice|youPay|offerPrice|sellingPrice|currentPrice|price|displayPrice|totalPayable|amount)"\s*:\s*"?([\d,\.]+)"?',
-                html, re.I
-            )
-            if m:
-                price = _to_float(m.group(2))
-
-        # Image
-        image = None
-        if product_data and product_data.get('image'):
-            img = product_data['image']
-            if isinstance(img, list):
-                image = img[0] if img else None
-            else:
-                image = img
-            image = _abs_url(url, image)
-
-        if not image:
-            for sel in ['meta[property="og:image"]', 'meta[name="twitter:image"]', 'link[rel="image_src"]']:
-                mt = soup.select_one(sel)
-                if mt and mt.get('content'):
-                    image = _abs_url(url, mt['content'])
-                    if image:
-                        break
-
-        if not image:
-            img_selectors = [
-                'img[itemprop="image"]',
-                '.pdp-image img',
-                '.product-image img',
-                '.main-image img',
-                '.gallery-image img',
-                '.product-gallery img',
-                '.pdp__image img',
-                '.swiper-slide img',
-                'picture source'  # for <picture><source srcset=...>
-            ]
-            for sel in img_selectors:
-                el = soup.select_one(sel)
-                if not el:
-                    continue
-                src = el.get('src') or el.get('data-src') or el.get('data-original') or el.get('data-lazy')
-                if not src:
-                    srcset = el.get('srcset') or el.get('data-srcset')
-                    if srcset:
-                        # take highest-res from srcset
-                        parts = [p.strip().split(' ') for p in srcset.split(',')]
-                        if parts:
-                            src = parts[-1][0]
-                if src:
-                    image = _abs_url(url, src)
-                    if image:
-                        break
-
-        # If still no image, try from JSON blobs
-        if not image:
-            blobs = _extract_any_json_blobs(html, soup)
-            for b in blobs:
-                u = _bfs_find_first_image(b)
-                if u:
-                    image = _abs_url(url, u)
-                    break
-
-        # Rating and count
-        rating = None
-        rating_count = None
-        if product_data and product_data.get('aggregateRating'):
-            agg = product_data['aggregateRating']
-            rating = _to_float(agg.get('ratingValue'))
-            rc = _to_float(agg.get('reviewCount') or agg.get('ratingCount'))
-            rating_count = int(rc) if rc is not None else None
-
-        if rating is None:
-            for sel in ['.rating-value', '.star-rating .rating', '[itemprop="ratingValue"]', '.reviews-rating']:
-                el = soup.select_one(sel)
-                if el:
-                    val = el.get('content') if el.name == 'meta' else el.get_text()
-                    r = _to_float(val)
-                    if r is not None:
-                        rating = r
-                        break
-
-        if rating_count is None:
-            for sel in ['.rating-count', '.reviews-count', '.total-reviews', '[itemprop="reviewCount"]']:
-                el = soup.select_one(sel)
-                if el:
-                    val = el.get('content') if el.name == 'meta' else el.get_text()
-                    m = re.search(r'([\d,]+)', val)
-                    if m:
-                        try:
-                            rating_count = int(m.group(1).replace(',', ''))
-                            break
-                        except:
-                            pass
-
-        return {
-            'title': title[:200],
-            'price': price,
-            'image': image,
-            'rating': rating,
-            'rating_count': rating_count
-        }
+        return parse_if_changed(url, resp, d.text, PRICE_MARKERS, parse_croma_html)
 
     except Exception as e:
         print(f"Croma scraping error: {e}")
-        return None
\ No newline at end of file
+        return None
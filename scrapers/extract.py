@@ -0,0 +1,148 @@
+# scrapers/extract.py
+"""
+Shared HTML extraction engine for the scrapers.
+
+A page is parsed into a single lxml tree (Page). Selectors are written as
+CSS, compiled to XPath once at import time (rule()), and grouped per field
+(Field). An Extractor runs every field against the same tree and returns
+title/price/image/rating/... together, so a scraper's hot path is a few
+precompiled XPath evaluations in C instead of BeautifulSoup walking the
+tree once per fallback selector.
+"""
+from __future__ import annotations
+import html as _html, json, re
+from typing import Callable
+
+from lxml import etree, html as lxml_html
+from cssselect import GenericTranslator
+
+_translator = GenericTranslator()
+_parser = lxml_html.HTMLParser(recover=True, remove_comments=True)
+
+_LDJSON = etree.XPath('//script[@type="application/ld+json"]')
+_VISIBLE_TEXT = etree.XPath('//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]')
+
+
+def _node_text(el, sep: str = "") -> str:
+    """Like BeautifulSoup's get_text(sep, strip=True)."""
+    return sep.join(t.strip() for t in el.itertext() if t and t.strip())
+
+
+class Page:
+    """One parsed document plus lazily computed views shared by all fields."""
+
+    def __init__(self, text: str | bytes, url: str = ""):
+        self.url = url
+        self._raw = text
+        try:
+            self.root = lxml_html.document_fromstring(text, parser=_parser)
+        except ValueError:
+            # str input carrying an XML encoding declaration
+            self.root = lxml_html.document_fromstring(text.encode("utf-8"), parser=_parser)
+        except etree.ParserError:
+            self.root = lxml_html.document_fromstring("<html></html>")
+        self._jsonld = None
+        self._text = None
+
+    @property
+    def html(self) -> str:
+        """Raw markup as str (for regex fallbacks over inline scripts)."""
+        if not isinstance(self._raw, str):
+            self._raw = self._raw.decode("utf-8", "replace")
+        return self._raw
+
+    def select(self, r: "Rule") -> list:
+        return r.xpath(self.root)
+
+    def first(self, r: "Rule"):
+        found = r.xpath(self.root)
+        return found[0] if found else None
+
+    def text(self) -> str:
+        """Whole-document visible text joined by spaces (for regex fallbacks)."""
+        if self._text is None:
+            self._text = " ".join(t.strip() for t in _VISIBLE_TEXT(self.root) if t.strip())
+        return self._text
+
+    def jsonld(self) -> list:
+        """Every parseable application/ld+json block, decoded once per page."""
+        if self._jsonld is None:
+            out = []
+            for s in _LDJSON(self.root):
+                raw = (s.text or "").strip()
+                if not raw:
+                    continue
+                try:
+                    out.append(json.loads(raw))
+                except ValueError:
+                    try:
+                        out.append(json.loads(_html.unescape(raw)))
+                    except ValueError:
+                        m = re.search(r"\{.*\}", raw, re.S)
+                        if m:
+                            try:
+                                out.append(json.loads(m.group(0)))
+                            except ValueError:
+                                pass
+            self._jsonld = out
+        return self._jsonld
+
+
+class Rule:
+    """A CSS selector compiled to XPath once, plus where to read the value from."""
+    __slots__ = ("css", "xpath", "attrs", "sep")
+
+    def __init__(self, css: str, attrs: tuple[str, ...] = (), sep: str = ""):
+        self.css = css
+        self.xpath = etree.XPath(_translator.css_to_xpath(css))
+        self.attrs = attrs
+        self.sep = sep
+
+    def value(self, el) -> str | None:
+        if self.attrs:
+            for a in self.attrs:
+                v = el.get(a)
+                if v:
+                    return v.strip()
+            return None
+        if el.tag == "meta":
+            v = el.get("content")
+            return v.strip() if v else None
+        return _node_text(el, self.sep)
+
+
+def rule(css: str, *attrs: str, sep: str = "") -> Rule:
+    """Compile css; read attrs in order (meta tags default to @content, others to text)."""
+    return Rule(css, attrs, sep)
+
+
+class Field:
+    """Ordered fallback rules for one field; the first rule yielding a parsed value wins."""
+
+    def __init__(self, *rules: Rule, parse: Callable[[str], object] | None = None):
+        self.rules = rules
+        self.parse = parse
+
+    def __call__(self, page: Page):
+        for r in self.rules:
+            el = page.first(r)
+            if el is None:
+                continue
+            raw = r.value(el)
+            if not raw:
+                continue
+            val = self.parse(raw) if self.parse else raw
+            if val is not None and val != "":
+                return val
+        return None
+
+
+class Extractor:
+    """Runs a fixed set of Fields against one Page and returns them as a dict."""
+
+    def __init__(self, **fields: Field):
+        self.fields = fields
+
+    def __call__(self, page: Page, only: tuple[str, ...] | None = None) -> dict:
+        names = only or tuple(self.fields)
+        return {name: self.fields[name](page) for name in names}
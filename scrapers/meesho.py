@@ -1,7 +1,12 @@
 # scrapers/meesho.py
 from __future__ import annotations
-from bs4 import BeautifulSoup
-import requests, time, re, json, html
+import contextvars, os, re, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .extract import Page, Field, rule
+from .session import get_session
+from .ratelimit import throttle
+from .conditional import UNCHANGED, request_headers, parse_if_changed
+from .stream import download
 
 UA_DESKTOP = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
               "(KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36")
@@ -38,7 +43,7 @@ def _pick_from_srcset(srcset: str) -> str | None:
     except:
         return None
 
-def _read_only_mirror(url: str) -> str | None:
+def _read_only_mirror(url: str, cancel=None, on_send=None):
     if url.startswith("https://"):
         mirror = "https://r.jina.ai/http://" + url[len("https://"):]
     elif url.startswith("http://"):
@@ -46,25 +51,130 @@ def _read_only_mirror(url: str) -> str | None:
     else:
         mirror = "https://r.jina.ai/http://" + url
     try:
-        r = requests.get(mirror, timeout=20)
-        r.raise_for_status()
-        return r.text
+        throttle(mirror)
+        if cancel is not None and cancel.is_set():
+            return None  # lost the race while waiting for the limiter: never send it
+        if on_send is not None:
+            on_send()
+        d = download(get_session(mirror), mirror, timeout=20, cancel=cancel)
+        d.response.raise_for_status()
+        return d
     except:
         return None
 
-def _fetch(url: str, headers: dict, use_cloudscraper=False) -> str | None:
+def _fetch(url: str, headers: dict, use_cloudscraper=False, cancel=None, on_send=None):
+    """The Download (200, or 304 to a conditional request), or None on any failure or bot wall."""
     try:
-        if use_cloudscraper:
-            import cloudscraper
-            s = cloudscraper.create_scraper(browser={'browser':'chrome','platform':'windows','desktop':True})
-            r = s.get(url, headers=headers, timeout=20, allow_redirects=True)
-        else:
-            r = requests.get(url, headers=headers, timeout=20, allow_redirects=True)
-        r.raise_for_status()
-        return r.text
+        throttle(url)
+        if cancel is not None and cancel.is_set():
+            return None  # lost the race while waiting for the limiter: never send it
+        if on_send is not None:
+            on_send()
+        s = get_session(url, cloudscraper=use_cloudscraper,
+                        browser={'browser':'chrome','platform':'windows','desktop':True})
+        d = download(s, url, headers=request_headers(url, headers), timeout=20, allow_redirects=True,
+                     walls=WALLS, stop_markers=STOP_MARKERS, cancel=cancel)
+        d.response.raise_for_status()
+        if d.wall or (cancel is not None and cancel.is_set()):
+            return None  # bot wall, or another strategy already won
+        return d
     except Exception:
         return None
 
+
+# ---- hedged fetch cascade ----------------------------------------------------
+# Meesho blocks unpredictably, so there are several ways to get a page. Rather
+# than trying them one after another (5 x 20 s when blocked), the best-ranked
+# strategy starts first and, if it hasn't answered within HEDGE_DELAY of
+# actually sending its request (time queued in the rate limiter doesn't
+# count), the next one starts alongside it; a failure starts the next one at
+# once. The first usable page wins; the others are cancelled, and one still
+# waiting on the limiter never sends at all. Strategies are ranked by a
+# decaying success score, so whatever works lately is tried first.
+HEDGE_DELAY = float(os.environ.get("MEESHO_HEDGE_DELAY", 2.0))
+HEDGE_MAX_PARALLEL = int(os.environ.get("MEESHO_HEDGE_MAX_PARALLEL", 3))
+SCORE_DECAY = 0.8
+
+_HEADERS_DESKTOP = {"User-Agent": UA_DESKTOP, "Accept-Language": "en-IN,en;q=0.9", "Referer": "https://www.meesho.com/", "DNT": "1"}
+_HEADERS_MOBILE = {"User-Agent": UA_MOBILE, "Accept-Language": "en-IN,en;q=0.9", "Referer": "https://www.meesho.com/", "DNT": "1"}
+
+# name -> fetch(url, cancel, on_send); declaration order is the initial ranking.
+# on_send() is called just before the request goes out, after the limiter.
+STRATEGIES = {
+    "cloudscraper-desktop": lambda url, cancel, on_send: _fetch(url, _HEADERS_DESKTOP, True, cancel, on_send),
+    "cloudscraper-mobile": lambda url, cancel, on_send: _fetch(url, _HEADERS_MOBILE, True, cancel, on_send),
+    "plain-desktop": lambda url, cancel, on_send: _fetch(url, _HEADERS_DESKTOP, False, cancel, on_send),
+    "plain-mobile": lambda url, cancel, on_send: _fetch(url, _HEADERS_MOBILE, False, cancel, on_send),
+    "mirror": lambda url, cancel, on_send: _read_only_mirror(url, cancel, on_send),
+}
+_scores = {name: 0.5 - i * 0.01 for i, name in enumerate(STRATEGIES)}
+_scores_lock = threading.Lock()
+_pool: ThreadPoolExecutor | None = None
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _scores_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="meesho-hedge")
+        return _pool
+
+
+def _ranked() -> list[str]:
+    with _scores_lock:
+        return sorted(STRATEGIES, key=_scores.get, reverse=True)
+
+
+def _score(name: str, ok: bool) -> None:
+    with _scores_lock:
+        _scores[name] = SCORE_DECAY * _scores[name] + (1 - SCORE_DECAY) * (1.0 if ok else 0.0)
+
+
+def _hedged_fetch(url: str):
+    """First usable Download from the ranked strategies, hedging slow ones; None if all fail."""
+    queue = _ranked()
+    cancel = threading.Event()
+    wake = threading.Event()  # an attempt sent its request or finished
+    running = {}
+    sent_at = []  # when the newest attempt sent its request (empty while it waits on the limiter)
+    start_next = True
+    pool = _get_pool()
+    try:
+        while queue or running:
+            wake.clear()
+            now = time.monotonic()
+            hedge_due = bool(sent_at) and now >= sent_at[0] + HEDGE_DELAY
+            if queue and len(running) < HEDGE_MAX_PARALLEL and (start_next or hedge_due):
+                name = queue.pop(0)
+                sent_at = []
+                # contextvars (conditional fetch headers) don't follow work into pool threads on their own
+                ctx = contextvars.copy_context()
+                fut = pool.submit(ctx.run, STRATEGIES[name], url, cancel,
+                                  lambda mark=sent_at: (mark.append(time.monotonic()), wake.set()))
+                fut.add_done_callback(lambda _: wake.set())
+                running[fut] = name
+                start_next = False
+                continue
+            done = [fut for fut in running if fut.done()]
+            for fut in done:
+                name = running.pop(fut)
+                d = fut.result()
+                _score(name, d is not None)
+                if d is not None:
+                    return d
+                start_next = True  # a failure starts the next strategy at once
+            if done:
+                continue
+            timeout = None
+            if queue and len(running) < HEDGE_MAX_PARALLEL and sent_at:
+                timeout = max(0.0, sent_at[0] + HEDGE_DELAY - now)
+            wake.wait(timeout)
+        return None
+    finally:
+        cancel.set()  # losers stop at their next chunk, or before sending if still throttled
+        for fut in running:
+            fut.cancel()
+
 def _pick_jsonld(ld, key: str):
     def find(d):
         if not isinstance(d, dict): return None
@@ -99,94 +209,91 @@ def _pick_jsonld(ld, key: str):
         return find(ld)
     return None
 
-def get_meesho_product_details(url: str) -> dict | None:
-    headers = {
-        "User-Agent": UA_DESKTOP,
-        "Accept-Language": "en-IN,en;q=0.9",
-        "Referer": "https://www.meesho.com/",
-        "DNT": "1",
-    }
-    try:
-        time.sleep(1.0)
-        html_text = (
-            _fetch(url, headers, use_cloudscraper=True) or
-            _fetch(url, {"User-Agent": UA_MOBILE, "Accept-Language": "en-IN,en;q=0.9", "Referer": "https://www.meesho.com/", "DNT": "1"}, use_cloudscraper=True) or
-            _fetch(url, headers, use_cloudscraper=False) or
-            _fetch(url, {"User-Agent": UA_MOBILE, "Accept-Language": "en-IN,en;q=0.9", "Referer": "https://www.meesho.com/", "DNT": "1"}, use_cloudscraper=False) or
-            _read_only_mirror(url)
-        )
-        if not html_text:
-            print("Meesho: failed to fetch (403/blocked)")
-            return None
+# Selectors are compiled once at import; order is fallback priority
+META_TITLE = Field(rule('meta[property="og:title"], meta[name="twitter:title"]'))
+META_IMAGE = Field(rule('meta[property="og:image:secure_url"], meta[property="og:image"], meta[name="twitter:image"]'))
+PRICE = Field(
+    rule('meta[property="product:price:amount"]'),
+    rule('[class*="price"], [id*="price"], [data-testid*="price"]', sep=" "),
+    parse=_price_num,
+)
+PRELOAD_IMAGE = Field(rule('link[rel="preload"][as="image"][href]', "href"))
+_PICTURE_IMG = rule("main picture img")
+CDN_IMAGE = Field(rule("img[src*='images.meesho.com'], img[src*='cdn.meesho.com']", "src", "data-src", "data-original"))
 
-        soup = BeautifulSoup(html_text, "lxml")
-        title = price = image = None
-
-        # JSON-LD
-        for s in soup.select('script[type="application/ld+json"]'):
-            raw = (s.string or s.get_text() or "").strip()
-            if not raw: continue
-            try:
-                ld = json.loads(raw)
-            except:
-                try: ld = json.loads(html.unescape(raw))
-                except: continue
-            if not ld: continue
-            title = title or _pick_jsonld(ld, "title")
-            if image is None:
-                im = _pick_jsonld(ld, "image")
-                if im: image = im
-            if price is None:
-                pr = _pick_jsonld(ld, "price")
-                if pr: price = _price_num(str(pr))
-
-        # Meta fallbacks
-        if not title:
-            el = soup.select_one('meta[property="og:title"], meta[name="twitter:title"]')
-            if el and el.get("content"): title = el.get("content").strip()
-
-        if not image:
-            el = soup.select_one('meta[property="og:image:secure_url"], meta[property="og:image"], meta[name="twitter:image"]')
-            if el and el.get("content"): image = el.get("content").strip()
 
+# start of the markup hashed to detect an unchanged price (see conditional.py)
+PRICE_MARKERS = ('class="price', '"sellingPrice"', '"finalPrice"')
+# once all of these have streamed in (a pair: its closer after its opener), the rest of
+# the page is not downloaded (see stream.py)
+STOP_MARKERS = ((b'"offers"', b'</script>'), b'og:image')
+WALLS = (b"access denied", b"just a moment")
+
+
+def parse_meesho_html(text: str, url: str = "") -> dict | None:
+    """Extract product details from a Meesho product page."""
+    page = Page(text, url)
+    title = price = image = None
+
+    # JSON-LD
+    for ld in page.jsonld():
+        if not ld: continue
+        title = title or _pick_jsonld(ld, "title")
+        if image is None:
+            im = _pick_jsonld(ld, "image")
+            if im: image = im
         if price is None:
-            pm = soup.select_one('meta[property="product:price:amount"]')
-            if pm and pm.get("content"): price = _price_num(pm.get("content"))
-        if price is None:
-            el = soup.select_one('[class*="price"], [id*="price"], [data-testid*="price"]')
-            if el: price = _price_num(el.get_text(" ", strip=True))
-        if price is None:
-            m = re.search(r"₹\s*([\d,]+(?:\.\d+)?)", soup.get_text(" ", strip=True))
-            if m:
-                try: price = float(m.group(1).replace(",", ""))
-                except: pass
-
-        # Visible image fallbacks
-        if not image:
-            pl = soup.select_one('link[rel="preload"][as="image"][href]')
-            if pl: image = pl.get("href")
-        if not image:
-            pic = soup.select_one("main picture img")
-            if pic:
-                image = pic.get("src") or pic.get("data-src") or pic.get("data-original")
-                if not image and pic.get("srcset"):
-                    image = _pick_from_srcset(pic.get("srcset"))
-        if not image:
-            img = soup.select_one("img[src*='images.meesho.com'], img[src*='cdn.meesho.com']")
-            if img:
-                image = img.get("src") or img.get("data-src") or img.get("data-original")
-
-        if image: image = _ensure_https(image)
-        if not title:
+            pr = _pick_jsonld(ld, "price")
+            if pr: price = _price_num(str(pr))
+
+    # Meta fallbacks
+    if not title:
+        title = META_TITLE(page)
+    if not image:
+        image = META_IMAGE(page)
+    if price is None:
+        price = PRICE(page)
+    if price is None:
+        m = re.search(r"₹\s*([\d,]+(?:\.\d+)?)", page.text())
+        if m:
+            try: price = float(m.group(1).replace(",", ""))
+            except: pass
+
+    # Visible image fallbacks
+    if not image:
+        image = PRELOAD_IMAGE(page)
+    if not image:
+        pic = page.first(_PICTURE_IMG)
+        if pic is not None:
+            image = pic.get("src") or pic.get("data-src") or pic.get("data-original")
+            if not image and pic.get("srcset"):
+                image = _pick_from_srcset(pic.get("srcset"))
+    if not image:
+        image = CDN_IMAGE(page)
+
+    if image: image = _ensure_https(image)
+    if not title:
+        return None
+
+    return {
+        "title": (title or "Meesho Product")[:200],
+        "price": price,
+        "image": image,
+        "rating": None,
+        "rating_count": None,
+    }
+
+
+def get_meesho_product_details(url: str) -> dict | None:
+    try:
+        d = _hedged_fetch(url)
+        if not d:
+            print("Meesho: failed to fetch (403/blocked)")
             return None
+        if d.response.status_code == 304:
+            return UNCHANGED
 
-        return {
-            "title": (title or "Meesho Product")[:200],
-            "price": price,
-            "image": image,
-            "rating": None,
-            "rating_count": None,
-        }
+        return parse_if_changed(url, d.response, d.text, PRICE_MARKERS, parse_meesho_html)
     except Exception as e:
         print(f"Meesho scraping error: {e}")
-        return None
\ No newline at end of file
+        return None
@@ -1,8 +1,11 @@
-from bs4 import BeautifulSoup
 import requests
-import time
 import re
-import json
+from .extract import Page, Field, rule
+from .session import get_session
+from .ratelimit import throttle
+from .conditional import UNCHANGED, request_headers, parse_if_changed
+from .stream import download
+from . import aio
 
 def _to_float(num):
     if num is None:
@@ -49,200 +52,188 @@ def _price_from_offers(offers):
 
     return None
 
-def get_myntra_product_details(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept-Language": "en-US,en;q=0.9",
-        # Avoid advertising Brotli unless requests has brotli installed
-        "Accept-Encoding": "gzip, deflate",
-        "Connection": "keep-alive",
-        "Referer": "https://www.google.com/"
+def _pick_product(obj):
+    if isinstance(obj, dict) and obj.get('@type') == 'Product':
+        return obj
+    return None
+
+
+def _jsonld_product(page):
+    """First schema.org Product in the page's JSON-LD (top level, list or @graph)."""
+    for data in page.jsonld():
+        if isinstance(data, dict):
+            pd = _pick_product(data)
+            if pd:
+                return pd
+            # sometimes Product is nested in @graph
+            if isinstance(data.get('@graph'), list):
+                for item in data['@graph']:
+                    pd = _pick_product(item)
+                    if pd:
+                        return pd
+        elif isinstance(data, list):
+            for item in data:
+                pd = _pick_product(item)
+                if pd:
+                    return pd
+    return None
+
+
+def _first_number(txt):
+    m = re.search(r'(\d+\.?\d*)', txt)
+    return _to_float(m.group(1)) if m else None
+
+
+def _count(txt):
+    m = re.search(r'([\d,]+)', txt)
+    try:
+        return int(m.group(1).replace(',', '')) if m else None
+    except ValueError:
+        return None
+
+
+# Selectors are compiled once at import; order is fallback priority
+TITLE = Field(*(rule(sel) for sel in (
+    'h1.pdp-title', 'h1.pdp-name', '.pdp-product-name',
+    'h1[data-testid="name"]', '.product-base-title h1',
+    '.pdp-e-product-title', '.product-title', 'h1'
+)))
+META_PRICE = Field(rule('meta[itemprop="price"]'), rule('meta[property="product:price:amount"]'), parse=_to_float)
+# DOM selectors fallbacks (Myntra class names change often)
+DOM_PRICE = Field(*(rule(sel, sep=" ") for sel in (
+    'span.pdp-price > strong',
+    'div.pdp-price > strong',
+    'span.pdp-discounted-price',
+    'div.pdp-price-info span',
+    '.product-discountedPrice',
+    '.product-discountPrice',
+    '.pdp-offers-price',
+    '.price-current',
+    '.pdp-price'  # generic last resort
+)), parse=_to_float)
+IMAGE = Field(*(rule(sel, 'src', 'data-src', 'data-original') for sel in (
+    '.pdp-product-img img',
+    '.image-grid img',
+    '.product-image img',
+    '.product-sliderImage img',
+    '.product-base-imgContainer img'
+)), parse=lambda v: v if v.startswith('http') else None)
+RATING = Field(rule('.index-overallRating'), rule('[data-testid="rating"]'), rule('.ratings-rating'),
+               parse=_first_number)
+RATING_COUNT = Field(rule('.index-ratingsCount'), rule('.ratings-count'), rule('[data-testid="ratingsCount"]'),
+                     parse=_count)
+
+
+# start of the markup hashed to detect an unchanged price (see conditional.py)
+PRICE_MARKERS = ('class="pdp-price', 'class="pdp-discounted-price', 'class="pdp-price-info', '"discountedPrice"')
+# once all of these have streamed in (a pair: its closer after its opener), the rest of
+# the page is not downloaded (see stream.py)
+STOP_MARKERS = ((b'"offers"', b'</script>'), (b'"aggregateRating"', b'</script>'))
+
+
+def parse_myntra_html(text, url=""):
+    """Extract product details from a Myntra product page."""
+    page = Page(text, url)
+
+    # 1) JSON-LD Product block (most reliable)
+    product_data = _jsonld_product(page)
+
+    # Title
+    title = None
+    if product_data and product_data.get('name'):
+        title = product_data['name']
+    if not title:
+        title = TITLE(page)
+    if not title:
+        print("Myntra: Could not find product title")
+        return None
+
+    # Price
+    price = None
+    if product_data and product_data.get('offers'):
+        price = _price_from_offers(product_data['offers'])
+    if not price:
+        price = META_PRICE(page)
+    if not price:
+        price = DOM_PRICE(page)
+
+    # As an ultimate fallback, try to sniff a JSON blob for price-ish fields
+    if not price:
+        m = re.search(r'"(offerPrice|discountedPrice|price)"\s*:\s*"?([\d,\.]+)"?', page.html, re.I)
+        if m:
+            price = _to_float(m.group(2))
+
+    # Image
+    image = None
+    if product_data and product_data.get('image'):
+        image = product_data['image'][0] if isinstance(product_data['image'], list) else product_data['image']
+    if not image:
+        image = IMAGE(page)
+
+    # Rating
+    rating = None
+    rating_count = None
+    if product_data and product_data.get('aggregateRating'):
+        rating = _to_float(product_data['aggregateRating'].get('ratingValue'))
+        rating_count = _to_float(product_data['aggregateRating'].get('reviewCount'))
+        rating_count = int(rating_count) if rating_count else None
+    if not rating:
+        rating = RATING(page)
+    if not rating_count:
+        rating_count = RATING_COUNT(page)
+
+    return {
+        'title': title[:200],
+        'price': price,
+        'image': image,
+        'rating': rating,
+        'rating_count': rating_count
     }
 
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    # Avoid advertising Brotli unless requests has brotli installed
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+    "Referer": "https://www.google.com/"
+}
+
+
+def _result(url, d):
+    resp = d.response
+    if resp.status_code == 304:
+        return UNCHANGED
+    resp.raise_for_status()
+    return parse_if_changed(url, resp, d.text, PRICE_MARKERS, parse_myntra_html)
+
+
+def get_myntra_product_details(url):
     try:
-        time.sleep(1.5)
-        resp = requests.get(url, headers=headers, timeout=20)
-        resp.raise_for_status()
-        html = resp.text
-        soup = BeautifulSoup(html, "html.parser")
-
-        # 1) JSON-LD Product block (most reliable)
-        product_data = None
-        for script in soup.find_all('script', type='application/ld+json'):
-            text = script.string or script.get_text(strip=True)
-            if not text:
-                continue
-            # Some pages contain a list; others a single object
-            try:
-                data = json.loads(text)
-            except Exception:
-                # best-effort: extract the first JSON object
-                m = re.search(r'\{.*\}', text, re.S)
-                if not m:
-                    continue
-                try:
-                    data = json.loads(m.group(0))
-                except Exception:
-                    continue
-
-            def pick_product(obj):
-                if isinstance(obj, dict) and obj.get('@type') == 'Product':
-                    return obj
-                return None
-
-            if isinstance(data, dict):
-                pd = pick_product(data)
-                if pd:
-                    product_data = pd
-                    break
-                # sometimes Product is nested in @graph
-                if '@graph' in data and isinstance(data['@graph'], list):
-                    for item in data['@graph']:
-                        pd = pick_product(item)
-                        if pd:
-                            product_data = pd
-                            break
-                if product_data:
-                    break
-            elif isinstance(data, list):
-                for item in data:
-                    pd = pick_product(item)
-                    if pd:
-                        product_data = pd
-                        break
-                if product_data:
-                    break
-
-        # Title
-        title = None
-        if product_data and product_data.get('name'):
-            title = product_data['name']
-
-        if not title:
-            title_selectors = [
-                'h1.pdp-title', 'h1.pdp-name', '.pdp-product-name',
-                'h1[data-testid="name"]', '.product-base-title h1',
-                '.pdp-e-product-title', '.product-title', 'h1'
-            ]
-            for sel in title_selectors:
-                el = soup.select_one(sel)
-                if el and el.get_text(strip=True):
-                    title = el.get_text(strip=True)
-                    break
-
-        if not title:
-            print("Myntra: Could not find product title")
-            return None
+        throttle(url)
+        d = download(get_session(url), url, headers=request_headers(url, HEADERS), timeout=20,
+                     stop_markers=STOP_MARKERS)
+        return _result(url, d)
 
-        # Price
-        price = None
-        if product_data and product_data.get('offers'):
-            price = _price_from_offers(product_data['offers'])
-
-        # Meta fallbacks
-        if not price:
-            meta = soup.select_one('meta[itemprop="price"]')
-            if meta and meta.get('content'):
-                price = _to_float(meta.get('content'))
-
-        if not price:
-            meta = soup.select_one('meta[property="product:price:amount"]')
-            if meta and meta.get('content'):
-                price = _to_float(meta.get('content'))
-
-        # DOM selectors fallbacks (Myntra class names change often)
-        if not price:
-            price_selectors = [
-                'span.pdp-price > strong',
-                'div.pdp-price > strong',
-                'span.pdp-discounted-price',
-                'div.pdp-price-info span',
-                '.product-discountedPrice',
-                '.product-discountPrice',
-                '.pdp-offers-price',
-                '.price-current',
-                '.pdp-price'  # generic last resort
-            ]
-            for sel in price_selectors:
-                el = soup.select_one(sel)
-                if not el:
-                    continue
-                txt = el.get('content') if el.name == 'meta' else el.get_text(" ", strip=True)
-                p = _to_float(txt)
-                if p:
-                    price = p
-                    break
-
-        # As an ultimate fallback, try to sniff a JSON blob for price-ish fields
-        if not price:
-            m = re.search(r'"(offerPrice|discountedPrice|price)"\s*:\s*"?([\d,\.]+)"?', html, re.I)
-            if m:
-                price = _to_float(m.group(2))
-
-        # Image
-        image = None
-        if product_data and product_data.get('image'):
-            image = product_data['image'][0] if isinstance(product_data['image'], list) else product_data['image']
-
-        if not image:
-            image_selectors = [
-                '.pdp-product-img img',
-                '.image-grid img',
-                '.product-image img',
-                '.product-sliderImage img',
-                '.product-base-imgContainer img'
-            ]
-            for sel in image_selectors:
-                el = soup.select_one(sel)
-                if el:
-                    image = el.get('src') or el.get('data-src') or el.get('data-original')
-                    if image and image.startswith('http'):
-                        break
-
-        # Rating
-        rating = None
-        if product_data and product_data.get('aggregateRating'):
-            rating = _to_float(product_data['aggregateRating'].get('ratingValue'))
-
-        if not rating:
-            for sel in ['.index-overallRating', '[data-testid="rating"]', '.ratings-rating']:
-                el = soup.select_one(sel)
-                if el:
-                    m = re.search(r'(\d+\.?\d*)', el.get_text())
-                    if m:
-                        rating = _to_float(m.group(1))
-                        if rating:
-                            break
-
-        # Rating count
-        rating_count = None
-        if product_data and product_data.get('aggregateRating'):
-            rating_count = _to_float(product_data['aggregateRating'].get('reviewCount'))
-            rating_count = int(rating_count) if rating_count else None
-
-        if not rating_count:
-            for sel in ['.index-ratingsCount', '.ratings-count', '[data-testid="ratingsCount"]']:
-                el = soup.select_one(sel)
-                if el:
-                    m = re.search(r'([\d,]+)', el.get_text())
-                    if m:
-                        try:
-                            rating_count = int(m.group(1).replace(',', ''))
-                            break
-                        except:
-                            pass
-
-        return {
-            'title': title[:200],
-            'price': price,
-            'image': image,
-            'rating': rating,
-            'rating_count': rating_count
-        }
+    except requests.RequestException as e:
+        print(f"Myntra request error: {e}")
+        return None
+    except Exception as e:
+        print(f"Myntra scraping error: {e}")
+        return None
+
+
+async def get_myntra_product_details_async(url):
+    try:
+        await aio.throttle(url)
+        d = await aio.download(url, headers=request_headers(url, HEADERS), timeout=20,
+                               stop_markers=STOP_MARKERS)
+        return _result(url, d)
 
     except requests.RequestException as e:
         print(f"Myntra request error: {e}")
         return None
     except Exception as e:
         print(f"Myntra scraping error: {e}")
-        return None
\ No newline at end of file
+        return None
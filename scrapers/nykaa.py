@@ -1,125 +1,125 @@
-from bs4 import BeautifulSoup
-import requests
-import time
 import re
+from .extract import Page, Extractor, Field, rule
+from .session import get_session
+from .ratelimit import throttle
+from .conditional import UNCHANGED, request_headers, parse_if_changed
+from .stream import download
+from . import aio
 
-def get_nykaa_product_details(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "DNT": "1",
-        "Connection": "keep-alive"
-    }
-    
+def _digits_price(txt):
+    txt = re.sub(r'[^\d]', '', txt.replace('₹', '').replace(',', ''))
     try:
-        time.sleep(2)
-        response = requests.get(url, headers=headers, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-        
-        # Title selectors for Nykaa
-        title = None
-        title_selectors = [
-            'h1.product-title',
-            '.product-name h1',
-            '.pdp-product-name',
-            'h1[data-testid="pdpProductName"]'
-        ]
-        
-        for selector in title_selectors:
-            title_elem = soup.select_one(selector)
-            if title_elem:
-                title = title_elem.get_text().strip()
-                break
-        
-        if not title:
-            return None
-        
-        # Price selectors for Nykaa
-        price = None
-        price_selectors = [
-            '.final-price',
-            '.product-price-final',
-            '.price-final .amount',
-            '[data-testid="pdpPrice"]'
-        ]
-        
-        for selector in price_selectors:
-            price_elem = soup.select_one(selector)
-            if price_elem:
-                price_text = price_elem.get_text().strip()
-                price_text = re.sub(r'[^\d]', '', price_text.replace('₹', '').replace(',', ''))
-                try:
-                    price = float(price_text)
-                    break
-                except ValueError:
-                    continue
-        
-        # Image selectors for Nykaa
-        image = None
-        image_selectors = [
+        return float(txt)
+    except ValueError:
+        return None
+
+
+def _first_number(txt):
+    m = re.search(r'(\d+\.?\d*)', txt)
+    return float(m.group(1)) if m else None
+
+
+def _count(txt):
+    m = re.search(r'([\d,]+)', txt.replace(',', ''))
+    return int(m.group(1)) if m else None
+
+
+# Selectors are compiled once at import; order is fallback priority
+FIELDS = Extractor(
+    title=Field(
+        rule('h1.product-title'),
+        rule('.product-name h1'),
+        rule('.pdp-product-name'),
+        rule('h1[data-testid="pdpProductName"]'),
+    ),
+    price=Field(
+        rule('.final-price'),
+        rule('.product-price-final'),
+        rule('.price-final .amount'),
+        rule('[data-testid="pdpPrice"]'),
+        parse=_digits_price,
+    ),
+    image=Field(
+        *(rule(sel, 'src', 'data-src') for sel in (
             '.product-image-main img',
             '.product-gallery img',
             '.pdp-image img',
-            '[data-testid="pdpImage"]'
-        ]
-        
-        for selector in image_selectors:
-            image_elem = soup.select_one(selector)
-            if image_elem:
-                image = image_elem.get('src') or image_elem.get('data-src')
-                if image and image.startswith('http'):
-                    break
-        
-        # Rating selectors for Nykaa
-        rating = None
-        rating_selectors = [
-            '.rating-value',
-            '.product-rating .rating',
-            '[data-testid="pdpRating"]'
-        ]
-        
-        for selector in rating_selectors:
-            rating_elem = soup.select_one(selector)
-            if rating_elem:
-                rating_text = rating_elem.get_text()
-                rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                if rating_match:
-                    try:
-                        rating = float(rating_match.group(1))
-                        break
-                    except ValueError:
-                        continue
-        
-        # Rating count for Nykaa
-        rating_count = None
-        count_selectors = [
-            '.rating-count',
-            '.reviews-count',
-            '[data-testid="pdpReviewCount"]'
-        ]
-        
-        for selector in count_selectors:
-            count_elem = soup.select_one(selector)
-            if count_elem:
-                count_text = count_elem.get_text()
-                count_match = re.search(r'([\d,]+)', count_text.replace(',', ''))
-                if count_match:
-                    try:
-                        rating_count = int(count_match.group(1).replace(',', ''))
-                        break
-                    except ValueError:
-                        continue
-        
-        return {
-            'title': title[:200],
-            'price': price,
-            'image': image,
-            'rating': rating,
-            'rating_count': rating_count
-        }
-        
+            '[data-testid="pdpImage"]',
+        )),
+        parse=lambda v: v if v.startswith('http') else None,
+    ),
+    rating=Field(
+        rule('.rating-value'),
+        rule('.product-rating .rating'),
+        rule('[data-testid="pdpRating"]'),
+        parse=_first_number,
+    ),
+    rating_count=Field(
+        rule('.rating-count'),
+        rule('.reviews-count'),
+        rule('[data-testid="pdpReviewCount"]'),
+        parse=_count,
+    ),
+)
+
+
+# start of the markup hashed to detect an unchanged price (see conditional.py)
+PRICE_MARKERS = ('class="final-price', 'class="product-price-final', 'class="price-final', 'data-testid="pdpPrice"')
+# once all of these have streamed in, the rest of the page is not downloaded (see stream.py)
+STOP_MARKERS = (b'class="final-price', b'product-image-main', b'class="reviews-count')
+
+
+def parse_nykaa_html(text, url=""):
+    """Extract product details from a Nykaa product page."""
+    fields = FIELDS(Page(text, url))
+    if not fields['title']:
+        return None
+
+    return {
+        'title': fields['title'][:200],
+        'price': fields['price'],
+        'image': fields['image'],
+        'rating': fields['rating'],
+        'rating_count': fields['rating_count']
+    }
+
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive"
+}
+
+
+def _result(url, d):
+    response = d.response
+    if response.status_code == 304:
+        return UNCHANGED
+    response.raise_for_status()
+    return parse_if_changed(url, response, d.content, PRICE_MARKERS, parse_nykaa_html)
+
+
+def get_nykaa_product_details(url):
+    try:
+        throttle(url)
+        d = download(get_session(url), url, headers=request_headers(url, HEADERS), timeout=20,
+                     stop_markers=STOP_MARKERS)
+        return _result(url, d)
+
+    except Exception as e:
+        print(f"Nykaa scraping error: {e}")
+        return None
+
+
+async def get_nykaa_product_details_async(url):
+    try:
+        await aio.throttle(url)
+        d = await aio.download(url, headers=request_headers(url, HEADERS), timeout=20,
+                               stop_markers=STOP_MARKERS)
+        return _result(url, d)
+
     except Exception as e:
         print(f"Nykaa scraping error: {e}")
         return None
@@ -0,0 +1,104 @@
+# scrapers/pipeline.py
+"""
+Fetch / parse pipeline: HTML parsing in a process pool.
+
+Parsing a product page is CPU bound and holds the GIL, so however many
+fetches are in flight, one process parses one page at a time. Once start()
+has been called (scheduler.py and checker.py do; the web app doesn't),
+scrape() / scrape_async() still fetch in their threads or on the event
+loop, but the scrapers' parse_if_changed() hands the page back as a
+ParseJob instead of parsing it there. The registry ships the job's body to
+a ProcessPoolExecutor whose workers run the platform's parse_*_html and
+return its small result dict.
+
+At most QUEUE_DEPTH pages are queued in or being parsed by the pool at
+once. A fetcher with a page beyond that waits (blocks or awaits) before
+handing it over, and fetches nothing else meanwhile, so a fast network
+cannot pile unbounded HTML up in memory.
+
+    SCRAPER_PARSE_PROCESSES   parser processes (default: one per CPU)
+    SCRAPER_PARSE_QUEUE       pages allowed in the parse stage (default 2 per process)
+"""
+from __future__ import annotations
+import asyncio, atexit, contextlib, contextvars, multiprocessing, os, threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+PARSE_PROCESSES = int(os.environ.get("SCRAPER_PARSE_PROCESSES", os.cpu_count() or 1))
+QUEUE_DEPTH = int(os.environ.get("SCRAPER_PARSE_QUEUE", 0))
+
+_defer = contextvars.ContextVar("defer_parse", default=False)
+_pool: ProcessPoolExecutor | None = None
+_slots: threading.BoundedSemaphore | None = None
+_async_slots: asyncio.Semaphore | None = None
+_depth = 0
+_size = 0
+_lock = threading.Lock()
+
+
+@dataclass
+class ParseJob:
+    """A fetched page waiting to be parsed; done(result) runs back in this process."""
+    url: str
+    parse: Callable  # module-level parse_*_html, so it pickles by reference
+    body: str | bytes
+    done: Callable[[dict | None], dict | None]
+
+    def run(self) -> dict | None:
+        """Parse in the pool, blocking the calling thread (and its fetching) while the stage is full."""
+        with _slots:
+            info = _pool.submit(self.parse, self.body, self.url).result()
+        return self.done(info)
+
+    async def run_async(self) -> dict | None:
+        global _async_slots
+        if _async_slots is None:  # bound to the running loop on first use
+            _async_slots = asyncio.Semaphore(_depth)
+        async with _async_slots:
+            info = await asyncio.get_running_loop().run_in_executor(_pool, self.parse, self.body, self.url)
+        return self.done(info)
+
+
+def start(processes: int | None = None) -> int:
+    """Start the parser pool once per process; returns its size (0 = parse inline)."""
+    global _pool, _slots, _depth, _size
+    n = PARSE_PROCESSES if processes is None else processes
+    with _lock:
+        if _pool is None and n > 0:
+            # spawn, not fork: the parent already runs the aio loop, mailer and SQLAlchemy threads
+            _pool = ProcessPoolExecutor(max_workers=n, mp_context=multiprocessing.get_context("spawn"))
+            _depth = QUEUE_DEPTH or 2 * n
+            _slots = threading.BoundedSemaphore(_depth)
+            _size = n
+            atexit.register(stop)
+        return _size if _pool else 0
+
+
+def stop() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def running() -> bool:
+    return _pool is not None
+
+
+@contextlib.contextmanager
+def deferred():
+    """Inside this block parse_if_changed() returns ParseJobs, if the pool is running."""
+    if _pool is None:
+        yield
+        return
+    token = _defer.set(True)
+    try:
+        yield
+    finally:
+        _defer.reset(token)
+
+
+def deferring() -> bool:
+    return _defer.get()
@@ -0,0 +1,105 @@
+# scrapers/ratelimit.py
+"""
+Per-host politeness for the scrapers.
+
+Each host gets a token bucket (rate = requests/second, burst = bucket size).
+An idle host has a full bucket, so the first requests go out immediately;
+only sustained traffic to one host is spaced out. Buckets are independent,
+so different hosts never wait on each other.
+
+Defaults can be overridden with:
+    SCRAPER_QPS            default rate for unknown hosts (default 1.0)
+    SCRAPER_BURST          default burst for unknown hosts (default 3)
+    SCRAPER_RATE_LIMITS    per-host overrides, e.g. "amazon.in=0.5:3,meesho.com=1:2"
+"""
+from __future__ import annotations
+import os, threading, time
+from urllib.parse import urlparse
+
+from .urls import AMAZON_DOMAINS
+
+DEFAULT_QPS = float(os.environ.get("SCRAPER_QPS", 1.0))
+DEFAULT_BURST = int(os.environ.get("SCRAPER_BURST", 3))
+
+# host suffix -> (qps, burst); roughly the pacing the old fixed sleeps gave
+HOST_LIMITS: dict[str, tuple[float, int]] = {
+    **{d: (0.5, 3) for d in AMAZON_DOMAINS},
+    "flipkart.com": (1.0, 3),
+    "myntra.com": (0.67, 3),
+    "meesho.com": (1.0, 3),
+    "croma.com": (1.0, 3),
+    "ajio.com": (0.5, 3),
+    "nykaa.com": (0.5, 3),
+}
+
+
+def _parse_overrides(spec: str) -> dict[str, tuple[float, int]]:
+    out = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item or "=" not in item:
+            continue
+        host, val = item.split("=", 1)
+        qps, _, burst = val.partition(":")
+        try:
+            out[host.strip().lower()] = (float(qps), int(burst or DEFAULT_BURST))
+        except ValueError:
+            print(f"Ignoring bad SCRAPER_RATE_LIMITS entry: {item}")
+    return out
+
+
+HOST_LIMITS.update(_parse_overrides(os.environ.get("SCRAPER_RATE_LIMITS", "")))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            # token is borrowed from the future; callers queue up behind each other
+            return -self.tokens / self.rate
+
+    def acquire(self) -> float:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_buckets: dict[str, TokenBucket] = {}
+_lock = threading.Lock()
+
+
+def _limits_for(host: str) -> tuple[float, int]:
+    for suffix, limits in HOST_LIMITS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return limits
+    return DEFAULT_QPS, DEFAULT_BURST
+
+
+def bucket_for(url: str) -> TokenBucket:
+    host = (urlparse(url).hostname or "").lower()
+    b = _buckets.get(host)
+    if b is None:
+        with _lock:
+            b = _buckets.get(host)
+            if b is None:
+                b = _buckets[host] = TokenBucket(*_limits_for(host))
+    return b
+
+
+def throttle(url: str) -> float:
+    """Block until url's host may be hit again; returns seconds waited."""
+    return bucket_for(url).acquire()
@@ -0,0 +1,187 @@
+# scrapers/registry.py
+"""
+Hostname -> scraper registry.
+
+Every platform module is imported once here, at startup, and registered
+under the domains it serves. Lookups walk the host's labels from the most
+specific suffix down ("www.amazon.in" -> "amazon.in" -> "in"), so routing
+is a few dict hits instead of a chain of substring checks. scrape() is the
+single entry point the app uses: it returns a uniform ScrapeResult and
+keeps per-platform call/failure/latency counters. With conditional=True
+the scrapers may answer "unchanged since last time" (see conditional.py),
+reported as a ScrapeResult with unchanged=True and no fields.
+
+scrape_async() runs on the asyncio backend (aio.py): platforms with an
+async fetcher use it, the rest run their blocking fetcher in a thread.
+With SCRAPER_BACKEND=async (the default) scrape() is a blocking wrapper
+around it and submit_scrape() starts one without waiting; with
+SCRAPER_BACKEND=threads scrape() calls the blocking fetchers directly.
+Either way, once pipeline.start() has run, pages are parsed in its process
+pool rather than in the fetching thread or on the event loop.
+
+While a host's circuit is open (breaker.py) its products are not fetched
+at all: they come back as a ScrapeResult with deferred=True.
+"""
+from __future__ import annotations
+import contextlib, os, threading, time
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from typing import Awaitable, Callable
+from urllib.parse import urlparse
+
+from .amazon import get_amazon_product_details, get_amazon_product_details_async
+from .flipkart import get_flipkart_product_details, get_flipkart_product_details_async
+from .myntra import get_myntra_product_details, get_myntra_product_details_async
+from .meesho import get_meesho_product_details
+from .croma import get_croma_product_details
+from .ajio import get_ajio_product_details, get_ajio_product_details_async
+from .nykaa import get_nykaa_product_details, get_nykaa_product_details_async
+from .urls import AMAZON_DOMAINS
+from . import aio, breaker as _breaker, conditional as _conditional, pipeline as _pipeline
+
+BACKEND = os.environ.get("SCRAPER_BACKEND", "async")  # async | threads
+
+
+@dataclass
+class ScrapeResult:
+    platform: str
+    title: str | None = None
+    price: float | None = None
+    image: str | None = None
+    rating: float | None = None
+    rating_count: int | None = None
+    unchanged: bool = False
+    deferred: bool = False  # host circuit open: not fetched, try again later
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class Scraper:
+    platform: str
+    domains: tuple[str, ...]
+    fetch: Callable[[str], dict | None]
+    fetch_async: Callable[[str], Awaitable[dict | None]] | None = None  # None: run fetch in a thread
+
+
+# Meesho (fallback cascade) and Croma (cloudscraper) stay on blocking sessions
+SCRAPERS = (
+    Scraper("Amazon", AMAZON_DOMAINS, get_amazon_product_details, get_amazon_product_details_async),
+    Scraper("Flipkart", ("flipkart.com",), get_flipkart_product_details, get_flipkart_product_details_async),
+    Scraper("Myntra", ("myntra.com",), get_myntra_product_details, get_myntra_product_details_async),
+    Scraper("Meesho", ("meesho.com",), get_meesho_product_details),
+    Scraper("Croma", ("croma.com",), get_croma_product_details),
+    Scraper("Ajio", ("ajio.com",), get_ajio_product_details, get_ajio_product_details_async),
+    Scraper("Nykaa", ("nykaa.com", "nykaafashion.com"), get_nykaa_product_details, get_nykaa_product_details_async),
+)
+
+_BY_DOMAIN: dict[str, Scraper] = {d: s for s in SCRAPERS for d in s.domains}
+
+
+def scraper_for(url: str) -> Scraper | None:
+    host = (urlparse(url).hostname or "").lower()
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        s = _BY_DOMAIN.get(".".join(labels[i:]))
+        if s is not None:
+            return s
+    return None
+
+
+def platform_for(url: str) -> str | None:
+    s = scraper_for(url)
+    return s.platform if s else None
+
+
+# ---- instrumentation -------------------------------------------------------
+_stats: dict[str, dict] = {}
+_stats_lock = threading.Lock()
+
+
+def _record(platform: str, ok: bool, elapsed: float) -> None:
+    with _stats_lock:
+        st = _stats.setdefault(platform, {"calls": 0, "failures": 0, "seconds": 0.0})
+        st["calls"] += 1
+        st["failures"] += 0 if ok else 1
+        st["seconds"] += elapsed
+
+
+def stats() -> dict[str, dict]:
+    with _stats_lock:
+        return {k: dict(v) for k, v in _stats.items()}
+
+
+def _finish(s: Scraper, url: str, raw, started: float) -> ScrapeResult | None:
+    if raw is None and _breaker.blocked_for(url):  # blocked, or skipped once the circuit opened
+        return ScrapeResult(platform=s.platform, deferred=True)
+    _record(s.platform, raw is not None, time.monotonic() - started)
+    return _coerce(s.platform, raw) if raw else None
+
+
+def _coerce(platform: str, raw: dict) -> ScrapeResult:
+    if raw is _conditional.UNCHANGED:
+        return ScrapeResult(platform=platform, unchanged=True)
+    price = raw.get("price")
+    rating_count = raw.get("rating_count")
+    return ScrapeResult(
+        platform=platform,
+        title=raw.get("title"),
+        price=float(price) if price is not None else None,
+        image=raw.get("image"),
+        rating=raw.get("rating"),
+        rating_count=int(rating_count) if rating_count is not None else None,
+    )
+
+
+def scrape(url: str, conditional: bool = False) -> ScrapeResult | None:
+    """Scrape url with its platform's scraper; None if unsupported or the scrape failed.
+
+    conditional=True allows an unchanged=True result when the page (or its
+    price region) is the same as at the last successful scrape. A host
+    behind an open circuit gives a deferred=True result.
+    """
+    if BACKEND == "async":
+        return aio.run(scrape_async(url, conditional))
+    s = scraper_for(url)
+    if s is None:
+        return None
+    if _breaker.blocked_for(url):
+        return ScrapeResult(platform=s.platform, deferred=True)
+    started = time.monotonic()
+    raw = None
+    try:
+        with _conditional.active() if conditional else contextlib.nullcontext(), _pipeline.deferred():
+            raw = s.fetch(url)
+        if isinstance(raw, _pipeline.ParseJob):
+            raw = raw.run()
+    except Exception as e:
+        print(f"{s.platform} scraper error: {e}")
+    return _finish(s, url, raw, started)
+
+
+async def scrape_async(url: str, conditional: bool = False) -> ScrapeResult | None:
+    """scrape() as a coroutine on the aio.py event loop."""
+    s = scraper_for(url)
+    if s is None:
+        return None
+    if _breaker.blocked_for(url):
+        return ScrapeResult(platform=s.platform, deferred=True)
+    started = time.monotonic()
+    raw = None
+    try:
+        with _conditional.active() if conditional else contextlib.nullcontext(), _pipeline.deferred():
+            if s.fetch_async is not None:
+                raw = await s.fetch_async(url)
+            else:
+                raw = await aio.in_thread(url, s.fetch, url)
+        if isinstance(raw, _pipeline.ParseJob):
+            raw = await raw.run_async()
+    except Exception as e:
+        print(f"{s.platform} scraper error: {e}")
+    return _finish(s, url, raw, started)
+
+
+def submit_scrape(url: str, conditional: bool = False) -> Future:
+    """Start scrape_async(url) on the background loop; the Future resolves to its result."""
+    return aio.submit(scrape_async(url, conditional))
@@ -0,0 +1,75 @@
+# scrapers/session.py
+"""
+Shared HTTP sessions for the scrapers.
+
+One keep-alive session per (host, flavour) is created lazily and reused
+across calls and threads, so repeated product pages on the same host skip
+the TCP+TLS handshake. Pool sizes are tunable through the environment:
+
+    SCRAPER_POOL_CONNECTIONS  connection pools kept per session (default 4)
+    SCRAPER_POOL_MAXSIZE      sockets kept alive per pool (default 16)
+"""
+from __future__ import annotations
+import os, threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_CONNECTIONS = int(os.environ.get("SCRAPER_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(os.environ.get("SCRAPER_POOL_MAXSIZE", 16))
+
+_sessions: dict[tuple[str, str], requests.Session] = {}
+_lock = threading.Lock()
+
+
+def _host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _new_plain_session() -> requests.Session:
+    s = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+def _new_cloudscraper_session(browser: dict | None) -> requests.Session:
+    try:
+        import cloudscraper
+    except Exception:
+        return _new_plain_session()
+    # cloudscraper mounts its own TLS adapter; keep it, it pools connections too
+    return cloudscraper.create_scraper(
+        browser=browser or {'browser': 'chrome', 'platform': 'windows', 'desktop': True}
+    )
+
+
+def get_session(url: str, cloudscraper: bool = False, browser: dict | None = None) -> requests.Session:
+    """
+    Return the shared session for url's host.
+    Callers must pass per-request headers to .get() rather than mutating
+    session.headers, since the session is shared between scrapers and threads.
+    """
+    key = (_host(url), "cloudscraper" if cloudscraper else "plain")
+    s = _sessions.get(key)
+    if s is not None:
+        return s
+    with _lock:
+        s = _sessions.get(key)
+        if s is None:
+            s = _new_cloudscraper_session(browser) if cloudscraper else _new_plain_session()
+            _sessions[key] = s
+        return s
+
+
+def close_all() -> None:
+    """Close every pooled session (used on shutdown)."""
+    with _lock:
+        for s in _sessions.values():
+            try:
+                s.close()
+            except Exception:
+                pass
+        _sessions.clear()
@@ -0,0 +1,159 @@
+# scrapers/stream.py
+"""
+Early-exit streaming downloads for product pages.
+
+download() reads the body in chunks instead of materialising r.text:
+
+  * the first WALL_SCAN_BYTES are checked (lowercased, chunk by chunk) for
+    captcha / JS-wall phrases, and the download stops at the first hit;
+  * once every one of the scraper's stop markers has been seen, another
+    STOP_MARGIN bytes are read (so the elements they open can close) and the
+    rest of the page is never downloaded. A marker can also be an
+    (opener, closer) pair, seen once closer follows opener - for script
+    blobs of any size, e.g. (b'__NEXT_DATA__', b'</script>');
+  * nothing beyond MAX_PAGE_BYTES is ever read.
+
+lxml parses the truncated document fine. When only a little of the body is
+left the rest is drained instead, so the keep-alive connection goes back to
+the pool; otherwise the connection is closed. Every download passes the
+host's circuit breaker first and reports its outcome to it (breaker.py).
+
+    SCRAPER_MAX_PAGE_BYTES   hard cap on bytes read per page (default 4 MiB)
+"""
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from typing import Union
+
+from . import breaker
+
+CHUNK_SIZE = 16 * 1024
+WALL_SCAN_BYTES = 64 * 1024
+STOP_MARGIN = 16 * 1024
+DRAIN_BELOW = 64 * 1024
+MAX_PAGE_BYTES = int(os.environ.get("SCRAPER_MAX_PAGE_BYTES", 4 * 1024 * 1024))
+
+StopMarker = Union[bytes, tuple[bytes, bytes]]  # a bare marker, or (opener, closer)
+
+
+@dataclass
+class Download:
+    response: object          # the requests.Response (status, headers, final url)
+    content: bytes = b""
+    complete: bool = True     # False if we stopped before the end of the body
+    wall: str | None = None   # the bot-wall phrase that stopped the download
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.response.encoding or "utf-8", "replace")
+
+
+def _finish(r, complete: bool) -> None:
+    if complete:
+        return
+    raw = getattr(r, "raw", None)
+    try:
+        left = int(r.headers.get("Content-Length", "")) - raw.tell()
+    except (TypeError, ValueError, AttributeError):
+        left = None
+    if left is not None and 0 <= left < DRAIN_BELOW:
+        for _ in r.iter_content(CHUNK_SIZE):  # cheap: keep the connection reusable
+            pass
+    else:
+        r.close()
+
+
+class _Scanner:
+    """Accumulates the body chunk by chunk and decides when to stop (shared with aio.py)."""
+
+    def __init__(self, walls: tuple[bytes, ...], stop_markers: tuple[StopMarker, ...], max_bytes: int | None):
+        self.walls = walls
+        self.pending = set(stop_markers)
+        self.opened: dict[tuple[bytes, bytes], int] = {}  # pair -> end of its opener in buf
+        self.max_bytes = max_bytes or MAX_PAGE_BYTES
+        self.buf = bytearray()
+        self.stop_at = None
+        self.complete = True
+        self.wall = None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Append chunk; True once the rest of the body should not be read."""
+        buf = self.buf
+        start = len(buf)
+        buf += chunk
+
+        if self.walls and start < WALL_SCAN_BYTES:
+            overlap = max(0, start - 32)
+            head = bytes(buf[overlap:WALL_SCAN_BYTES]).lower()
+            self.wall = next((w for w in self.walls if w in head), None)
+            if self.wall:
+                self.complete = False
+                return True
+
+        if self.pending:
+            for m in [m for m in self.pending if self._seen(m, start)]:
+                self.pending.discard(m)
+            if not self.pending:
+                self.stop_at = min(len(buf) + STOP_MARGIN, self.max_bytes)
+
+        if self.stop_at is not None and len(buf) >= self.stop_at:
+            del buf[self.stop_at:]
+            self.complete = False
+            return True
+        if len(buf) >= self.max_bytes:
+            del buf[self.max_bytes:]
+            self.complete = False
+            return True
+        return False
+
+    def _seen(self, marker: StopMarker, start: int) -> bool:
+        """Has marker (or a pair's closer after its opener) arrived? start = offset of the new chunk."""
+        if isinstance(marker, bytes):
+            return self.buf.find(marker, max(0, start - len(marker))) >= 0
+        opener, closer = marker
+        at = self.opened.get(marker)
+        if at is None:
+            i = self.buf.find(opener, max(0, start - len(opener)))
+            if i < 0:
+                return False
+            at = self.opened[marker] = i + len(opener)
+        return self.buf.find(closer, max(at, start - len(closer))) >= 0
+
+    def result(self, response) -> Download:
+        return Download(response, bytes(self.buf), self.complete, self.wall.decode() if self.wall else None)
+
+
+def download(session, url: str, *, walls: tuple[bytes, ...] = (), stop_markers: tuple[StopMarker, ...] = (),
+             max_bytes: int | None = None, cancel=None, **kwargs) -> Download:
+    """GET url with stream=True and read only as much of the body as the scraper needs.
+
+    walls are lowercase byte phrases looked for in the first WALL_SCAN_BYTES;
+    stop_markers are exact byte strings (or (opener, closer) pairs) that
+    must all appear before the download may stop early. Once cancel (a threading.Event) is set, reading
+    stops at the next chunk. Extra kwargs go to session.get().
+    Non-2xx responses are returned without reading the body.
+    """
+    breaker.acquire(url)
+    try:
+        r = session.get(url, stream=True, **kwargs)
+    except Exception:
+        breaker.report(url)
+        raise
+    if not 200 <= r.status_code < 300:
+        breaker.report(url, r)
+        r.close()
+        return Download(r)
+
+    scan = _Scanner(walls, stop_markers, max_bytes)
+    try:
+        for chunk in r.iter_content(CHUNK_SIZE):
+            if cancel is not None and cancel.is_set():
+                scan.complete = False
+                break
+            if chunk and scan.feed(chunk):
+                break
+    finally:
+        breaker.report(url, r, scan.wall)
+
+    _finish(r, scan.complete)
+    return scan.result(r)
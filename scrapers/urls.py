@@ -0,0 +1,58 @@
+# scrapers/urls.py
+"""
+Canonical product URLs.
+
+Different users paste the same product with different tracking params,
+slugs and referral tags. canonical_url() maps all of them to one stable,
+still-scrapable URL so the page can be fetched once and shared.
+"""
+from __future__ import annotations
+import re
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+_AMAZON_ASIN = re.compile(r"/(?:dp|gp/product|gp/aw/d|product)/([A-Z0-9]{10})(?:[/?]|$)", re.I)
+_MYNTRA_ID = re.compile(r"/(\d{5,})(?:/buy)?/?$")
+
+# every Amazon storefront shares the product page markup
+AMAZON_DOMAINS = (
+    "amazon.in", "amazon.com", "amazon.co.uk", "amazon.de", "amazon.fr", "amazon.it", "amazon.es",
+    "amazon.nl", "amazon.se", "amazon.pl", "amazon.com.be", "amazon.ca", "amazon.com.mx",
+    "amazon.com.br", "amazon.co.jp", "amazon.com.au", "amazon.sg", "amazon.ae", "amazon.sa",
+    "amazon.eg", "amazon.com.tr",
+)
+
+# query params that actually select the product; everything else is tracking noise
+_KEEP_PARAMS = {
+    "flipkart.com": {"pid"},
+    "nykaa.com": {"productId", "skuId"},
+}
+
+
+def _site(host: str) -> str | None:
+    for site in ("amazon", "flipkart.com", "myntra.com", "meesho.com", "croma.com", "ajio.com", "nykaa.com"):
+        if site in host:
+            return site
+    return None
+
+
+def canonical_url(url: str) -> str:
+    """Strip tracking params and reduce known platforms to their product id."""
+    p = urlparse(url.strip())
+    host = (p.hostname or "").lower()
+    path = re.sub(r"/{2,}", "/", p.path or "/")
+    site = _site(host)
+
+    if site == "amazon":
+        m = _AMAZON_ASIN.search(path)
+        if m:
+            return urlunparse(("https", host, f"/dp/{m.group(1).upper()}", "", "", ""))
+
+    if site == "myntra.com":
+        m = _MYNTRA_ID.search(path)
+        if m:
+            return urlunparse(("https", host, f"/{m.group(1)}", "", "", ""))
+
+    keep = _KEEP_PARAMS.get(site, set())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(p.query) if k in keep))
+    path = path.rstrip("/") or "/"
+    return urlunparse(("https", host, path, "", query, ""))
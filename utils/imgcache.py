@@ -0,0 +1,178 @@
+# utils/imgcache.py
+"""
+Content-addressed, size-bounded disk cache for /proxy/img.
+
+Entries live under <root>/<2 hex>/<sha256(url)>.img with a JSON sidecar
+holding the content type, upstream validators (ETag / Last-Modified),
+fetch time and a digest of the body used as our own ETag. Bodies are
+written incrementally through a CacheWriter, so a proxied image can be
+streamed to the client and into the cache at the same time. A file's mtime
+is bumped on every hit, so eviction simply drops the least recently used
+files until the cache is back under its byte budget. Writes go through a
+temp file + os.replace, so several gunicorn workers can share one cache
+directory safely.
+"""
+from __future__ import annotations
+import hashlib, json, os, tempfile, threading, time
+
+
+class CacheEntry:
+    def __init__(self, path: str, meta: dict):
+        self.path = path
+        self.meta = meta
+
+    @property
+    def content_type(self) -> str:
+        return self.meta.get("content_type") or "application/octet-stream"
+
+    @property
+    def digest(self) -> str:
+        return self.meta.get("digest", "")
+
+    def age(self) -> float:
+        return time.time() - self.meta.get("fetched_at", 0)
+
+
+class CacheWriter:
+    """Incremental writer for one entry; nothing is visible until commit()."""
+
+    def __init__(self, cache: "ImageCache", url: str, content_type: str,
+                 etag: str | None, last_modified: str | None):
+        self.cache = cache
+        self.url = url
+        self.body_path, self.meta_path = cache._paths(url)
+        os.makedirs(os.path.dirname(self.body_path), exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=os.path.dirname(self.body_path), suffix=".tmp")
+        self.f = os.fdopen(fd, "wb")
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.meta = {"url": url, "content_type": content_type,
+                     "etag": etag, "last_modified": last_modified}
+
+    def write(self, chunk: bytes) -> None:
+        self.f.write(chunk)
+        self.hash.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> CacheEntry:
+        self.f.close()
+        os.replace(self.tmp, self.body_path)
+        self.meta.update(fetched_at=time.time(), size=self.size,
+                         digest=self.hash.hexdigest()[:32])
+        self.cache._write_json(self.meta_path, self.meta)
+        self.cache._account(self.size)
+        return CacheEntry(self.body_path, self.meta)
+
+    def abort(self) -> None:
+        try:
+            self.f.close()
+            os.unlink(self.tmp)
+        except OSError:
+            pass
+
+
+class ImageCache:
+    def __init__(self, root: str, max_bytes: int, ttl: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._approx_size = None  # lazily measured, then tracked per put
+
+    # ---- paths -----------------------------------------------------------
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        d = os.path.join(self.root, key[:2])
+        return os.path.join(d, key + ".img"), os.path.join(d, key + ".json")
+
+    # ---- read ------------------------------------------------------------
+    def get(self, url: str) -> CacheEntry | None:
+        body, meta_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(body, None)  # LRU touch; also proves the body exists
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(body, meta)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.age() < self.ttl
+
+    def revalidated(self, entry: CacheEntry) -> CacheEntry:
+        """Upstream answered 304: restart the entry's freshness window."""
+        entry.meta["fetched_at"] = time.time()
+        _, meta_path = self._paths(entry.meta["url"])
+        self._write_json(meta_path, entry.meta)
+        return entry
+
+    # ---- write -----------------------------------------------------------
+    def writer(self, url: str, content_type: str,
+               etag: str | None = None, last_modified: str | None = None) -> CacheWriter:
+        return CacheWriter(self, url, content_type, etag, last_modified)
+
+    def put(self, url: str, body: bytes, content_type: str,
+            etag: str | None = None, last_modified: str | None = None) -> CacheEntry:
+        w = self.writer(url, content_type, etag, last_modified)
+        try:
+            w.write(body)
+            return w.commit()
+        except Exception:
+            w.abort()
+            raise
+
+    def _write_bytes(self, path: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _write_json(self, path: str, meta: dict) -> None:
+        self._write_bytes(path, json.dumps(meta).encode("utf-8"))
+
+    # ---- eviction --------------------------------------------------------
+    def _scan(self) -> list[tuple[float, int, str]]:
+        out = []
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(".img"):
+                    continue
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, p))
+        return out
+
+    def _account(self, added: int) -> None:
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = sum(size for _, size, _ in self._scan())
+            else:
+                self._approx_size += added
+            if self._approx_size > self.max_bytes:
+                self._approx_size = self._evict()
+
+    def _evict(self) -> int:
+        """Drop least recently used entries down to 90% of the budget; returns new size."""
+        files = sorted(self._scan())  # oldest mtime first
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+        for _, size, p in files:
+            if total <= target:
+                break
+            for victim in (p, p[:-len(".img")] + ".json"):
+                try:
+                    os.unlink(victim)
+                except OSError:
+                    pass
+            total -= size
+        return total
@@ -1 +1,168 @@
-# Email/WhatsApp notification logic
+# utils/notifier.py
+"""
+Outbound mail: one background dispatcher per process.
+
+Mailer.send() only enqueues the message and returns a Future. A single
+worker thread drains the queue over one persistent, authenticated SMTP
+connection (STARTTLS, implicit TLS or plain - the latter for local
+stand-ins such as aiosmtpd), so a burst of alerts costs one handshake and
+one login rather than one per email. The connection is recycled after
+max_per_session messages, closed after idle_seconds without mail, and
+re-established transparently when the server drops it.
+
+Transient failures (disconnects, socket errors, 4xx replies) are retried
+with exponential backoff; permanent ones (5xx, refused recipients) fail the
+message's Future immediately. close() - also registered with atexit -
+flushes whatever is still queued, so short-lived processes such as
+checker.py don't lose alerts.
+"""
+from __future__ import annotations
+import atexit, queue, random, smtplib, socket, ssl, threading, time
+from concurrent.futures import Future
+from email.message import Message
+
+_STOP = object()
+
+
+class Mailer:
+    def __init__(self, host: str, port: int, user: str | None = None, password: str | None = None,
+                 security: str = "starttls", timeout: float = 30, max_per_session: int = 100,
+                 idle_seconds: float = 30, max_retries: int = 4, backoff: float = 2.0):
+        if security not in ("starttls", "ssl", "none"):
+            raise ValueError(f"unknown SMTP security mode: {security}")
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.security = security
+        self.timeout = timeout
+        self.max_per_session = max_per_session
+        self.idle_seconds = idle_seconds
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+        self._queue: queue.Queue = queue.Queue()
+        self._conn: smtplib.SMTP | None = None
+        self._sent_on_conn = 0
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"sent": 0, "failed": 0, "retries": 0, "connections": 0}
+
+    # ---- public API ----------------------------------------------------------
+    def send(self, msg: Message) -> Future:
+        """Queue msg for delivery; the Future resolves to True or the final exception."""
+        fut: Future = Future()
+        if self._closed:
+            fut.set_exception(RuntimeError("mailer is closed"))
+            return fut
+        self._ensure_worker()
+        self._queue.put((msg, fut))
+        return fut
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until everything queued so far has been handled; False on timeout."""
+        if self._thread is None:
+            return True
+        marker: Future = Future()
+        self._queue.put((None, marker))
+        try:
+            marker.result(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def close(self, timeout: float | None = 30) -> None:
+        """Deliver what is queued, then stop the worker and quit the connection."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    # ---- worker --------------------------------------------------------------
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mailer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                self._disconnect()  # idle: don't hold a server slot open
+                continue
+            if item is _STOP:
+                break
+            msg, fut = item
+            if msg is None:  # flush() marker
+                fut.set_result(True)
+                continue
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                self._deliver(msg)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"Email to {msg.get('To')} failed: {e}")
+                fut.set_exception(e)
+            else:
+                self.stats["sent"] += 1
+                fut.set_result(True)
+        self._disconnect()
+
+    def _deliver(self, msg: Message) -> None:
+        attempt = 0
+        while True:
+            try:
+                conn = self._connection()
+                conn.send_message(msg)
+                self._sent_on_conn += 1
+                if self._sent_on_conn >= self.max_per_session:
+                    self._disconnect()
+                return
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                    smtplib.SMTPAuthenticationError, smtplib.SMTPNotSupportedError):
+                raise
+            except smtplib.SMTPResponseException as e:
+                self._disconnect()
+                if e.smtp_code >= 500 or attempt >= self.max_retries:
+                    raise
+            except (smtplib.SMTPException, OSError):
+                self._disconnect()
+                if attempt >= self.max_retries:
+                    raise
+            attempt += 1
+            self.stats["retries"] += 1
+            time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2))
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._conn is not None:
+            return self._conn
+        if self.security == "ssl":
+            conn = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                    context=ssl.create_default_context())
+        else:
+            conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.security == "starttls":
+                conn.starttls(context=ssl.create_default_context())
+        conn.ehlo_or_helo_if_needed()
+        if self.user and self.password and conn.has_extn("auth"):  # local stand-ins offer no AUTH
+            conn.login(self.user, self.password)
+        self._conn = conn
+        self._sent_on_conn = 0
+        self.stats["connections"] += 1
+        return conn
+
+    def _disconnect(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError, socket.timeout):
+            conn.close()
@@ -0,0 +1,159 @@
+# utils/scrapecache.py
+"""
+Scrape results shared across processes, in a small SQLite file.
+
+The gunicorn workers, checker.py and scheduler.py each went to the network
+for a product page even when another of them had scraped it seconds ago.
+ScrapeCache keeps the latest normalized result (a ScrapeResult dict) per
+canonical URL, so a result stored by any process is a hit in all of them
+until it is ttl seconds old. A failed scrape is stored as a negative entry
+(no data) that lives for negative_ttl, so a broken or removed page isn't
+re-fetched by every user who opens it meanwhile.
+
+The cache is its own file rather than a table in users.db so lookups never
+queue behind the refresh's commits for SQLite's single write lock. It runs
+in WAL mode; connections are opened per thread and per process (a forked
+child opens its own). Lookups only read: hit/miss counts are tallied in
+memory and added to the totals in the same file by the next store, or
+after every FLUSH_EVERY lookups, so stats() covers every process without
+each read taking the write lock. Any SQLite error is reported and treated
+as a miss: the cache never makes a scrape fail.
+"""
+from __future__ import annotations
+import atexit, json, os, sqlite3, threading, time
+
+PURGE_EVERY = 300  # seconds between sweeps of expired rows
+FLUSH_EVERY = 100  # lookups tallied in memory before they are written out
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_cache (
+    key TEXT PRIMARY KEY,
+    data TEXT,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scrape_cache_counters (
+    name TEXT PRIMARY KEY,
+    n INTEGER NOT NULL
+);
+"""
+_COUNT = ("INSERT INTO scrape_cache_counters (name, n) VALUES (?, ?) "
+          "ON CONFLICT(name) DO UPDATE SET n = n + excluded.n")
+_COUNTERS = ("hits", "negative_hits", "misses")
+
+
+class ScrapeCache:
+    def __init__(self, path: str, ttl: int, negative_ttl: int, busy_timeout: float = 5):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self._counts = dict.fromkeys(_COUNTERS, 0)  # not yet written to the file
+        self._counts_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    # ---- public API ----------------------------------------------------------
+    def lookup(self, key: str) -> tuple[bool, dict | None]:
+        """(hit, data); a hit with data None is a cached failure."""
+        if self.ttl <= 0:
+            return False, None
+        try:
+            row = self._conn().execute("SELECT data FROM scrape_cache WHERE key = ? AND expires_at > ?",
+                                       (key, time.time())).fetchone()
+        except sqlite3.Error as e:
+            print(f"Scrape cache lookup failed: {e}")
+            row = None
+        if row is None:
+            self._tally("misses")
+            return False, None
+        self._tally("hits" if row[0] is not None else "negative_hits")
+        return True, json.loads(row[0]) if row[0] is not None else None
+
+    def put(self, key: str, data: dict | None) -> None:
+        """Store a result (data None = the scrape failed)."""
+        self.put_many([(key, data)])
+
+    def put_many(self, items: list[tuple[str, dict | None]]) -> None:
+        """Store several results in one transaction."""
+        if self.ttl <= 0:
+            return
+        now = time.time()
+        rows = [(key, json.dumps(data) if data is not None else None, now,
+                 now + (self.ttl if data is not None else self.negative_ttl)) for key, data in items]
+        counts = self._take_counts()
+        if not rows and not counts:
+            return  # nothing to write: don't create the file just for this
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT OR REPLACE INTO scrape_cache (key, data, stored_at, expires_at) "
+                                 "VALUES (?, ?, ?, ?)", rows)
+                conn.executemany(_COUNT, counts)
+                if now - self._last_purge > PURGE_EVERY:
+                    self._last_purge = now
+                    conn.execute("DELETE FROM scrape_cache WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            print(f"Scrape cache store failed: {e}")
+
+    def stats(self) -> dict:
+        """Counters for all processes (plus this one's unwritten tally) and the live entry counts."""
+        try:
+            conn = self._conn()
+            counters = dict(conn.execute("SELECT name, n FROM scrape_cache_counters"))
+            with self._counts_lock:
+                for name, n in self._counts.items():
+                    counters[name] = counters.get(name, 0) + n
+            entries, negative = conn.execute(
+                "SELECT count(*), count(*) - count(data) FROM scrape_cache WHERE expires_at > ?",
+                (time.time(),)).fetchone()
+        except sqlite3.Error as e:
+            return {"error": str(e)}
+        hits = counters.get("hits", 0) + counters.get("negative_hits", 0)
+        lookups = hits + counters.get("misses", 0)
+        return {
+            "hits": counters.get("hits", 0),
+            "negative_hits": counters.get("negative_hits", 0),
+            "misses": counters.get("misses", 0),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "negative_entries": negative,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+        }
+
+    def flush(self) -> None:
+        """Write this process's hit/miss tally out now (a no-op when nothing was looked up)."""
+        with self._counts_lock:
+            if not any(self._counts.values()):
+                return
+        self.put_many([])
+
+    # ---- counters ------------------------------------------------------------
+    def _tally(self, name: str) -> None:
+        with self._counts_lock:
+            self._counts[name] += 1
+            due = sum(self._counts.values()) >= FLUSH_EVERY
+        if due:
+            self.flush()
+
+    def _take_counts(self) -> list[tuple[str, int]]:
+        with self._counts_lock:
+            counts = [(name, n) for name, n in self._counts.items() if n]
+            self._counts = dict.fromkeys(_COUNTERS, 0)
+        return counts
+
+    # ---- connections ---------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # autocommit: single statements commit on their own, put_many() opens its transaction
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
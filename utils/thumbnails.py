@@ -0,0 +1,82 @@
+# utils/thumbnails.py
+"""
+Resized WebP/AVIF derivatives for the image proxy.
+
+Pillow is optional: without it (or without a codec) make_thumbnail()
+returns None and the proxy falls back to serving the original image.
+"""
+from __future__ import annotations
+from io import BytesIO
+
+try:
+    from PIL import Image, features
+    _HAS_PIL = True
+except Exception:
+    _HAS_PIL = False
+
+# widths are snapped up to one of these so each image has a handful of variants
+THUMB_WIDTHS = (120, 240, 360, 480, 720, 960)
+
+_SAVE_ARGS = {
+    "avif": {"format": "AVIF", "quality": 55},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+
+def snap_width(raw) -> int | None:
+    try:
+        w = int(raw)
+    except (TypeError, ValueError):
+        return None
+    if w <= 0:
+        return None
+    for step in THUMB_WIDTHS:
+        if w <= step:
+            return step
+    return THUMB_WIDTHS[-1]
+
+
+def _can_save(fmt: str) -> bool:
+    if not _HAS_PIL:
+        return False
+    if fmt == "avif":
+        return "AVIF" in Image.SAVE or bool(features.check("avif"))
+    if fmt == "webp":
+        return bool(features.check("webp"))
+    return True
+
+
+def pick_format(accept_header: str) -> str:
+    """Best output format the browser accepts and Pillow can encode."""
+    accept = (accept_header or "").lower()
+    for fmt in ("avif", "webp"):
+        if f"image/{fmt}" in accept and _can_save(fmt):
+            return fmt
+    return "jpeg"
+
+
+def make_thumbnail(path: str, width: int, fmt: str) -> bytes | None:
+    """Downscale the image at path to width (never upscale) and encode as fmt."""
+    if not _can_save(fmt):
+        return None
+    try:
+        with Image.open(path) as im:
+            im.draft("RGB", (width, width * 4))  # lets JPEG decode at reduced scale
+            if im.width > width:
+                im.thumbnail((width, width * 4), Image.LANCZOS)
+            has_alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+            if not has_alpha:
+                im = im.convert("RGB")
+            elif fmt == "jpeg":  # no alpha channel in JPEG: flatten onto white
+                bg = Image.new("RGB", im.size, (255, 255, 255))
+                bg.paste(im.convert("RGBA"), mask=im.convert("RGBA").split()[-1])
+                im = bg
+            else:
+                im = im.convert("RGBA")
+            buf = BytesIO()
+            im.save(buf, **_SAVE_ARGS[fmt])
+            return buf.getvalue()
+    except Exception as e:
+        print(f"Thumbnail error for {path}: {e}")
+        return None